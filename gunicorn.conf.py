@@ -0,0 +1,50 @@
+"""Configuration of gunicorn, the production server of the app.
+
+Run with `invoke start-production`. Every setting can be overridden by its
+environment variable, e.g. GUNICORN_WORKERS=2.
+"""
+
+import os
+
+
+def _flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+
+# Each worker process serves requests from a pool of threads, so a slow chart or
+# ARIMA rollout only holds one thread of one worker
+workers = int(os.getenv("GUNICORN_WORKERS", str(os.cpu_count() or 1)))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+# Import the app, and load the fork-safe models, once in the master process. The
+# workers are forked from it and share the memory of those models.
+preload_app = _flag("GUNICORN_PRELOAD_APP", "true")
+if preload_app:
+    os.environ.setdefault("PRELOAD_SHARED_MODELS", "true")
+
+# Workers are replaced after serving about max_requests requests, which bounds the
+# memory they can leak. The jitter keeps them from restarting all at once.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+# A worker silent for `timeout` seconds is killed and replaced. gthread workers keep
+# notifying the master while their request threads are busy, so this does not bound
+# the requests: the forecasts and charts give up after FORECAST_TIMEOUT and
+# RENDER_TIMEOUT seconds instead.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG", None)
+
+
+def post_fork(server, worker):
+    if preload_app:
+        # The threads and locks of the model service stayed in the master process,
+        # and its model watcher only runs in the workers
+        from src.app.routes import model
+
+        model.after_fork()
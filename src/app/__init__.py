@@ -0,0 +1,3 @@
+"""Flask application of the API."""
+
+from . import startup  # noqa: F401  Imported first, so it times the whole startup
@@ -7,6 +7,7 @@ from flask import Flask
 from flask_cors import CORS
 
 from ..config import set_configuration
+from . import instrumentation, startup
 from .routes import blueprint
 
 load_dotenv()
@@ -34,6 +35,7 @@ def create_app():
         template_folder=template_dir,
     )
     CORS(app)
+    instrumentation.init_app(app)
     app.register_blueprint(blueprint)
 
     configuration_mode = os.getenv("FLASK_ENV")
@@ -42,6 +44,9 @@ def create_app():
     #
     # init_routes(app)
 
+    startup.mark("app")
+    startup.report()
+
     return app
 
 
@@ -0,0 +1,98 @@
+"""Measures the latency of the requests, and profiles a request on demand.
+
+A request is profiled when PROFILING_ENABLED is set and it has the header
+`X-Profile: 1`. Its response is then replaced by the profile of the request
+thread, sorted by cumulative time, and the original status is kept in the header
+`X-Profile-Status`. Only one request is profiled at a time. The predictions and
+charts of a profiled request run in its thread instead of the pools of the
+services, so that the profile shows them.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+
+from flask import Flask, g, make_response, request
+
+from src.services import inline
+from src.services.metrics import Histogram
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "50"))
+
+REQUEST_SECONDS = Histogram(
+    "fwo_http_request_duration_seconds", "Duration of an HTTP request, per route"
+)
+
+# cProfile cannot profile two threads of the same process at once
+_profile_lock = threading.Lock()
+
+
+def _before_request():
+    g.request_started = time.perf_counter()
+
+    if (
+        PROFILING_ENABLED
+        and request.headers.get("X-Profile") == "1"
+        and _profile_lock.acquire(blocking=False)
+    ):
+        g.inline_token = inline.start()
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+def _after_request(resp):
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        inline.stop(g.pop("inline_token"))
+        _profile_lock.release()
+
+        resp = _profile_response(profiler, resp.status_code)
+
+    started = g.pop("request_started", None)
+    if started is not None:
+        rule = request.url_rule
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            route=rule.rule if rule is not None else "unmatched",
+            method=request.method,
+            status=resp.status_code,
+        )
+
+    return resp
+
+
+def _teardown_request(exc):
+    # The response of a failed request is not seen by _after_request
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        inline.stop(g.pop("inline_token"))
+        _profile_lock.release()
+
+
+def _profile_response(profiler: cProfile.Profile, status: int):
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(
+        PROFILE_TOP_N
+    )
+
+    resp = make_response(out.getvalue(), 200)
+    resp.mimetype = "text/plain"
+    resp.headers["X-Profile-Status"] = str(status)
+
+    return resp
+
+
+def init_app(app: Flask):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
@@ -0,0 +1,95 @@
+"""Creates the JSON responses of the API, compressed and with an ETag."""
+
+import gzip
+import hashlib
+import json
+import os
+
+from flask import current_app, request
+
+from src.services.cache import LRUCache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))  # In bytes
+COMPRESS_LEVEL_GZIP = int(os.getenv("COMPRESS_LEVEL_GZIP", "6"))
+COMPRESS_LEVEL_BROTLI = int(os.getenv("COMPRESS_LEVEL_BROTLI", "5"))
+COMPRESS_CACHE_SIZE = int(os.getenv("COMPRESS_CACHE_SIZE", "64"))
+
+# The forecasts only change when the models do, so polled responses are compressed
+# once per ETag and encoding
+compressed_cache = LRUCache(COMPRESS_CACHE_SIZE)
+
+
+def dumps(data) -> bytes:
+    """Encode `data` as compact JSON with sorted keys, like `flask.jsonify` does."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS) + b"\n"
+
+    return json.dumps(data, sort_keys=True, separators=(",", ":")).encode() + b"\n"
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESS_LEVEL_BROTLI)
+
+    return gzip.compress(body, compresslevel=COMPRESS_LEVEL_GZIP, mtime=0)
+
+
+def _accepted_encoding() -> str:
+    """Return the best encoding accepted by the client, or None."""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+
+    return None
+
+
+def json_response(data, status: int = 200):
+    """Make a JSON response of `data` supporting ETag and compression.
+
+    The response is answered with 304 Not Modified when the client already holds
+    the same body (If-None-Match), and compressed with brotli or gzip when the
+    client accepts it and the body is at least COMPRESS_MIN_SIZE bytes.
+    """
+    body = dumps(data)
+
+    resp = current_app.response_class(body, status=status, mimetype="application/json")
+    resp.vary.add("Accept-Encoding")
+    if status != 200:
+        return resp
+
+    encoding = _accepted_encoding() if len(body) >= COMPRESS_MIN_SIZE else None
+
+    # Each encoding is a different representation, so it gets its own ETag
+    etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+    if encoding is not None:
+        etag = f"{etag}-{encoding}"
+    resp.set_etag(etag)
+
+    if request.if_none_match.contains_weak(etag):
+        resp.status_code = 304
+        resp.set_data(b"")
+
+        return resp
+
+    if encoding is not None:
+        compressed = compressed_cache.get(etag)
+        if compressed is None:
+            compressed = _compress(body, encoding)
+            compressed_cache.put(etag, compressed)
+
+        resp.set_data(compressed)
+        resp.headers["Content-Encoding"] = encoding
+
+    return resp
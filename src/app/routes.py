@@ -1,15 +1,149 @@
+import csv
+import hmac
+import io
+import math
+import os
 import traceback
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 import pandas as pd
-from flask import Blueprint, jsonify, make_response, render_template, request
+from flask import Blueprint, make_response, render_template, request
+from loguru import logger
 from pandas._libs.tslibs.parsing import DateParseError
 
-from src.services import db, model_service
+from src.services import db, metrics, model_service
+from src.services.admission import Rejected
+
+from . import responses, startup
+from .responses import json_response
 
 blueprint = Blueprint("fwo", __name__)
 
 
+startup.mark("imports")
+
 model = model_service.ModelService()
+# The master process of a pre-fork server does not reload its models, its workers
+# start their watcher in `after_fork`
+if model_service.MODEL_WATCH_INTERVAL > 0 and not model_service.PRELOAD_SHARED_MODELS:
+    model.watch_models()
+
+startup.mark("model service")
+
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", None)
+
+
+def _max_forecast_days(route: str) -> int:
+    """Longest horizon of `route`, in days: MAX_FORECAST_DAYS_<ROUTE> if set, e.g.
+    MAX_FORECAST_DAYS_ALL, else MAX_FORECAST_DAYS.
+
+    Longer horizons than the cached forecasts would run the models on every request,
+    so it is at most MAX_CACHED_FORECAST_DAYS, which is also the default.
+    """
+    max_cached = model_service.MAX_CACHED_FORECAST_DAYS
+    max_days = int(
+        os.getenv(
+            f"MAX_FORECAST_DAYS_{route.upper()}",
+            os.getenv("MAX_FORECAST_DAYS", str(max_cached)),
+        )
+    )
+    if max_days > max_cached:
+        logger.warning(
+            f"Forecasts of /forecast/{route} limited to {max_cached} days, "
+            "raise MAX_CACHED_FORECAST_DAYS to serve longer ones"
+        )
+        max_days = max_cached
+
+    return max_days
+
+
+MAX_FORECAST_DAYS = {
+    route: _max_forecast_days(route)
+    for route in ["receipts", "biowaste", "occupancy", "meal", "all"]
+}
+# Seconds after which the clients of rejected requests are told to retry
+RETRY_AFTER = os.getenv("RETRY_AFTER", "1")
+
+
+def _cache_counts(counted: str):
+    caches = {
+        "forecast": model.forecast_cache,
+        "compressed_response": responses.compressed_cache,
+        "db_reference": db.reference_cache,
+    }
+    if model._renderer is not None:
+        caches["chart"] = model._renderer.cache
+
+    return [({"cache": name}, getattr(c, counted)) for name, c in caches.items()]
+
+
+metrics.Collected(
+    "fwo_model_load_duration_seconds",
+    "Duration of the last load of a model",
+    "gauge",
+    lambda: [
+        ({"model": model_name, "restaurant": restaurant or ""}, duration)
+        for (model_name, restaurant), duration in dict(
+            model.registry.load_timings
+        ).items()
+    ],
+)
+metrics.Collected(
+    "fwo_startup_duration_seconds",
+    "Duration of a phase of the startup",
+    "gauge",
+    lambda: [
+        ({"phase": phase}, duration) for phase, duration in startup.timings.items()
+    ],
+)
+metrics.Collected(
+    "fwo_forecast_cache_bypasses_total",
+    "Forecasts longer than MAX_CACHED_FORECAST_DAYS, predicted without the cache",
+    "counter",
+    lambda: [({}, model.forecast_cache.bypasses)],
+)
+metrics.Collected(
+    "fwo_single_flight_shared_total",
+    "Calls that waited for an identical call in flight instead of computing",
+    "counter",
+    lambda: [
+        ({"layer": "model_service"}, model.in_flight.shared),
+        ({"layer": "forecast_cache"}, model.forecast_cache.in_flight.shared),
+    ],
+)
+metrics.Collected(
+    "fwo_admission_active",
+    "Forecasts being computed",
+    "gauge",
+    lambda: [({}, model.limiter.active)],
+)
+metrics.Collected(
+    "fwo_admission_queue_depth",
+    "Forecasts waiting for a free slot",
+    "gauge",
+    lambda: [({}, model.limiter.waiting)],
+)
+metrics.Collected(
+    "fwo_admission_rejected_total",
+    "Forecasts rejected, because the queue was full or the wait too long",
+    "counter",
+    lambda: [
+        ({"reason": reason}, count) for reason, count in model.limiter.rejected.items()
+    ],
+)
+metrics.Collected(
+    "fwo_cache_hits_total",
+    "Lookups answered from a cache",
+    "counter",
+    lambda: _cache_counts("hits"),
+)
+metrics.Collected(
+    "fwo_cache_misses_total",
+    "Lookups not found in a cache",
+    "counter",
+    lambda: _cache_counts("misses"),
+)
 
 
 # == APIs for Others ===================================================================================================================
@@ -29,30 +163,62 @@ def initial_view():
     return resp
 
 
+@blueprint.errorhandler(Rejected)
+def reject(e):
+    # 429 when the queue is full, 503 when it did not move: both are transient
+    resp = make_response(str(e), 429 if e.reason == "queue_full" else 503)
+    resp.headers["Retry-After"] = RETRY_AFTER
+
+    return resp
+
+
+@blueprint.errorhandler(FutureTimeoutError)
+def time_out(e):
+    # A prediction or a chart took longer than FORECAST_TIMEOUT or RENDER_TIMEOUT
+    logger.warning(f"Request to {request.path} timed out")
+
+    return make_response("Forecast timed out", 504)
+
+
+def _parse_days(max_days: int):
+    """Parse the query argument `days`, a number of days from 1 to `max_days`.
+
+    Returns:
+        tuple: parsed days and None, or None and an error response
+    """
+    days_raw = request.args.get("days")
+    if days_raw is None:
+        return None, make_response("Invalid query argument: 'days'", 400)
+
+    try:
+        days = int(days_raw)
+    except Exception as e:
+        return None, make_response(f"Error with query argument 'days': {e}", 400)
+
+    if days < 1 or days > max_days:
+        return None, make_response(
+            f"Invalid query argument: 'days' must be from 1 to {max_days}", 400
+        )
+
+    return days, None
+
+
 # == APIs for Forecast ===================================================================================================================
 @blueprint.route("/forecast/receipts")
 def forecast_receipt():
     resp = None
 
     # Request checking
-    days_raw = request.args.get("days")
-    if days_raw is None:
-        resp = make_response("Invalid query argument: 'days'", 400)
+    days, resp = _parse_days(MAX_FORECAST_DAYS["receipts"])
 
-    if resp is None:
-        assert days_raw
-
-        try:
-            days = int(days_raw)
-        except Exception as e:
-            # tb = traceback.format_exc()
-
-            resp = make_response(f"Error with query argument 'days': {e}", 400)
+    response_format = request.args.get("format", "records")
+    if response_format not in ["records", "columnar"]:
+        resp = make_response("Invalid query argument: 'format'", 400)
 
     if resp is None:
-        data = model.forecast_receipt(days)
+        data = model.forecast_receipt(days, columnar=response_format == "columnar")
 
-        resp = make_response(jsonify(data), 200)
+        resp = json_response(data)
 
     return resp
 
@@ -62,24 +228,16 @@ def forecast_biowaste():
     resp = None
 
     # Request checking
-    days_raw = request.args.get("days")
-    if days_raw is None:
-        resp = make_response("Invalid query argument: 'days'", 400)
+    days, resp = _parse_days(MAX_FORECAST_DAYS["biowaste"])
 
-    if resp is None:
-        assert days_raw
-
-        try:
-            days = int(days_raw)
-        except Exception as e:
-            # tb = traceback.format_exc()
-
-            resp = make_response(f"Error with query argument 'days': {e}", 400)
+    response_format = request.args.get("format", "records")
+    if response_format not in ["records", "columnar"]:
+        resp = make_response("Invalid query argument: 'format'", 400)
 
     if resp is None:
-        data = model.forecast_biowaste(days)
+        data = model.forecast_biowaste(days, columnar=response_format == "columnar")
 
-        resp = make_response(jsonify(data), 200)
+        resp = json_response(data)
 
     return resp
 
@@ -89,24 +247,16 @@ def forecast_occupancy():
     resp = None
 
     # Request checking
-    days_raw = request.args.get("days")
-    if days_raw is None:
-        resp = make_response("Invalid query argument: 'days'", 400)
-
-    if resp is None:
-        assert days_raw
-
-        try:
-            days = int(days_raw)
-        except Exception as e:
-            # tb = traceback.format_exc()
+    days, resp = _parse_days(MAX_FORECAST_DAYS["occupancy"])
 
-            resp = make_response(f"Error with query argument 'days': {e}", 400)
+    response_format = request.args.get("format", "records")
+    if response_format not in ["records", "columnar"]:
+        resp = make_response("Invalid query argument: 'format'", 400)
 
     if resp is None:
-        data = model.forecast_occupancy(days)
+        data = model.forecast_occupancy(days, columnar=response_format == "columnar")
 
-        resp = make_response(jsonify(data), 200)
+        resp = json_response(data)
 
     return resp
 
@@ -116,24 +266,45 @@ def forecast_meal():
     resp = None
 
     # Request checking
-    days_raw = request.args.get("days")
-    if days_raw is None:
-        resp = make_response("Invalid query argument: 'days'", 400)
+    days, resp = _parse_days(MAX_FORECAST_DAYS["meal"])
+
+    response_format = request.args.get("format", "records")
+    if response_format not in ["records", "columnar"]:
+        resp = make_response("Invalid query argument: 'format'", 400)
 
     if resp is None:
-        assert days_raw
+        data = model.forecast_sold_meals(days, columnar=response_format == "columnar")
 
-        try:
-            days = int(days_raw)
-        except Exception as e:
-            # tb = traceback.format_exc()
+        resp = json_response(data)
+
+    return resp
 
-            resp = make_response(f"Error with query argument 'days': {e}", 400)
+
+@blueprint.route("/forecast/all")
+def forecast_all():
+    resp = None
+
+    # Request checking
+    days, resp = _parse_days(MAX_FORECAST_DAYS["all"])
+
+    series_raw = request.args.get("series")
+    if series_raw is None:
+        series = list(model_service.FORECAST_SERIES)
+    else:
+        series = list(dict.fromkeys(series_raw.split(",")))
+        if not all(name in model_service.FORECAST_SERIES for name in series):
+            resp = make_response("Invalid query argument: 'series'", 400)
+
+    response_format = request.args.get("format", "records")
+    if response_format not in ["records", "columnar"]:
+        resp = make_response("Invalid query argument: 'format'", 400)
 
     if resp is None:
-        data = model.forecast_sold_meals(days)
+        data = model.forecast_all(
+            days, series=series, columnar=response_format == "columnar"
+        )
 
-        resp = make_response(jsonify(data), 200)
+        resp = json_response(data)
 
     return resp
 
@@ -147,7 +318,7 @@ def biowaste_from_meals():
     if (
         restaurant is None
         or not isinstance(restaurant, str)
-        or restaurant not in ["Chemicum", "Physicum", "Exactum"]
+        or restaurant not in model.restaurants
     ):
         resp = make_response("Invalid query argument: 'restaurant'", 400)
 
@@ -199,6 +370,10 @@ def biowaste_from_meals():
                 resp.headers.set("Content-Type", "application/json")
             else:
                 resp.headers.set("Content-Type", "image/png")
+        except Rejected:
+            raise
+        except ValueError as e:
+            resp = make_response(f"Error: {e}", 400)
         except Exception as e:
             tb = traceback.format_exc()
             print(tb)
@@ -217,7 +392,7 @@ def co2_from_meals():
     if (
         restaurant is None
         or not isinstance(restaurant, str)
-        or restaurant not in ["Chemicum", "Physicum", "Exactum"]
+        or restaurant not in model.restaurants
     ):
         resp = make_response("Invalid query argument: 'restaurant'", 400)
 
@@ -244,6 +419,8 @@ def co2_from_meals():
 
             resp = make_response(buf, 200)
             resp.headers.set("Content-Type", "application/json")
+        except Rejected:
+            raise
         except Exception as e:
             tb = traceback.format_exc()
             print(tb)
@@ -253,6 +430,101 @@ def co2_from_meals():
     return resp
 
 
+def _parse_meal_mixes(with_date: bool):
+    """Parse the meal mixes posted as a JSON array or as CSV with a header row.
+
+    Returns:
+        tuple: list of parsed meal mixes and None, or None and an error response
+    """
+    if request.mimetype == "text/csv":
+        meal_mixes = list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+    else:
+        meal_mixes = request.get_json(silent=True)
+
+    if not isinstance(meal_mixes, list) or len(meal_mixes) == 0:
+        return None, make_response("Body must be a non-empty JSON array or CSV", 400)
+
+    if len(meal_mixes) > MAX_BATCH_SIZE:
+        return None, make_response(f"Batch larger than {MAX_BATCH_SIZE} items", 400)
+
+    parsed = []
+    for i, meal_mix in enumerate(meal_mixes):
+        if not isinstance(meal_mix, dict):
+            return None, make_response(f"Invalid item {i}: not an object", 400)
+
+        restaurant = meal_mix.get("restaurant", None)
+        if restaurant not in model.restaurants:
+            return None, make_response(f"Invalid item {i}: 'restaurant'", 400)
+        item = {"restaurant": restaurant}
+
+        if with_date:
+            date = meal_mix.get("date", None)
+            try:
+                assert isinstance(date, str)
+                pd.to_datetime(date)
+            except (AssertionError, DateParseError, ValueError):
+                return None, make_response(f"Invalid item {i}: 'date'", 400)
+
+            # e.g. a weekend, or too far ahead
+            try:
+                model.business_days_to(pd.Timestamp(date))
+            except ValueError as e:
+                return None, make_response(f"Invalid item {i}: 'date': {e}", 400)
+            item["date"] = date
+
+        for meal_type in model_service.MEAL_TYPES:
+            try:
+                item[meal_type] = float(meal_mix[meal_type])
+                # float() accepts "nan" and "inf"
+                assert math.isfinite(item[meal_type])
+            except (AssertionError, KeyError, TypeError, ValueError):
+                return None, make_response(f"Invalid item {i}: '{meal_type}'", 400)
+
+        parsed.append(item)
+
+    return parsed, None
+
+
+@blueprint.route("/forecast/biowaste_from_meals/batch", methods=["POST"])
+def biowaste_from_meals_batch():
+    meal_mixes, resp = _parse_meal_mixes(with_date=True)
+
+    if resp is None:
+        try:
+            data = model.forecast_biowaste_with_meal_batch(meal_mixes)
+
+            resp = json_response(data)
+        except Rejected:
+            raise
+        except ValueError as e:
+            resp = make_response(f"Error: {e}", 400)
+        except Exception as e:
+            logger.exception("Batch forecast failed")
+
+            resp = make_response(f"Error: {e}", 500)
+
+    return resp
+
+
+@blueprint.route("/forecast/co2_from_meals/batch", methods=["POST"])
+def co2_from_meals_batch():
+    meal_mixes, resp = _parse_meal_mixes(with_date=False)
+
+    if resp is None:
+        try:
+            data = model.forecast_co2_with_meal_batch(meal_mixes)
+
+            resp = json_response(data)
+        except Rejected:
+            raise
+        except Exception as e:
+            logger.exception("Batch forecast failed")
+
+            resp = make_response(f"Error: {e}", 500)
+
+    return resp
+
+
 # == APIs for Recommendation ===================================================================================================================
 @blueprint.route("/recommendation")
 def recommend_menu():
@@ -263,7 +535,7 @@ def recommend_menu():
     if (
         restaurant is None
         or not isinstance(restaurant, str)
-        or restaurant not in ["Chemicum", "Physicum", "Exactum"]
+        or restaurant not in model.restaurants
     ):
         resp = make_response("Invalid query argument: 'restaurant'", 400)
 
@@ -279,41 +551,46 @@ def recommend_menu():
 
     if resp is None:
         # Fetch necessary data
-        menus = db.fetch("menu", date=date, restaurant=restaurant)
-        biowaste = db.fetch("biowaste")
-        co2 = db.fetch("co2")
-        pieces_per_dish = db.fetch("pieces_per_dish", date=date)
-        pieces_whole = db.fetch("pieces_whole", date=date, restaurant=restaurant)
-        dishes = db.fetch("dishes")
+        data = db.fetch_recommendation(date=date, restaurant=restaurant)
 
+        if data is None:
+            resp = make_response("Error: cannot fetch data from database", 500)
+
+    if resp is None:
         # Make up output
         buff = {}
 
-        buff["dishes_info"] = (
-            dishes.merge(co2, on="meal_id", how="inner")
-            .merge(biowaste, on="meal_id", how="inner")
-            .merge(pieces_per_dish, on="meal_id", how="inner")
-            .drop(columns=["date"])
-            .rename(columns={"pcs": "pcs_per_dish"})
-            .to_dict(orient="records")
-        )
-
-        cols = [
-            "dish_1",
-            "dish_2",
-            "dish_3",
-            "dish_4",
-            "total_co2",
-            "total_waste",
-            "total_pcs_from_dishes",
-            "co2_per_customer",
-            "waste_per_customer",
-        ]
-        buff["menus_info"] = menus[cols].to_dict(orient="records")
-
-        buff["pred_n_pcs_whole"] = pieces_whole["pcs"].item()
+        buff["dishes_info"] = data["dishes_info"].to_dict(orient="records")
+        buff["menus_info"] = data["menus_info"].to_dict(orient="records")
+        buff["pred_n_pcs_whole"] = data["pieces_whole"]["pcs"].item()
 
         resp = make_response(buff, 200)
         resp.headers.set("Content-Type", "application/json")
 
     return resp
+
+
+# == APIs for Administration ===================================================================================================================
+@blueprint.route("/admin/reload_models", methods=["POST"])
+def reload_models():
+    resp = None
+
+    token = request.headers.get("X-Admin-Token", "")
+    if ADMIN_TOKEN is None or not hmac.compare_digest(token, ADMIN_TOKEN):
+        resp = make_response("Forbidden", 403)
+
+    if resp is None:
+        if model.reload_models_in_background():
+            resp = make_response("Reloading models", 202)
+        else:
+            resp = make_response("Models are already being reloaded", 409)
+
+    return resp
+
+
+@blueprint.route("/metrics")
+def expose_metrics():
+    resp = make_response(metrics.expose(), 200)
+    resp.headers["Content-Type"] = metrics.CONTENT_TYPE
+
+    return resp
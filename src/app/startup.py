@@ -0,0 +1,35 @@
+"""Measures the phases of the application startup."""
+
+import time
+
+from loguru import logger
+
+STARTED_AT = time.perf_counter()
+
+timings = {}
+_last_mark = STARTED_AT
+
+
+def mark(phase: str):
+    """Record the time since the previous mark, or since import, as `phase`."""
+    global _last_mark
+
+    now = time.perf_counter()
+    timings[phase] = now - _last_mark
+    _last_mark = now
+
+
+def report() -> dict:
+    """Log the duration of every startup phase and of the whole startup.
+
+    Returns:
+        dict: duration in seconds per phase, and in total
+    """
+    ret = {**timings, "total": time.perf_counter() - STARTED_AT}
+
+    logger.info(
+        "Started in "
+        + ", ".join(f"{phase} {duration:.3f}s" for phase, duration in ret.items())
+    )
+
+    return ret
@@ -0,0 +1,267 @@
+"""Creates small synthetic stand-ins of the trained models and of the database.
+
+The stand-ins have the types, file names, inputs and outputs of the real ones, but
+are fitted on a few weeks of random data, so they are built in seconds and the
+benchmarks run offline.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from psycopg import sql
+
+from src.services import db
+from src.services.restaurant_registry import DEFAULT_RESTAURANTS
+
+# Opening hours of the restaurants, one timestamp per hour
+BUSINESS_HOURS = pd.offsets.BusinessHour(start="10:00", end="19:00")
+MEAL_COLUMNS = [
+    "num_fish",
+    "num_chicken",
+    "num_vegetable",
+    "num_meat",
+    "num_NotMapped",
+    "num_vegan",
+]
+BIOWASTE_COLUMNS = [
+    "amnt_waste_customer",
+    "amnt_waste_coffee",
+    "amnt_waste_kitchen",
+    "amnt_waste_hall",
+]
+# Meal counts of the menus, the input of the models from meals
+NUM_MEAL_TYPES = 5
+
+# Six tables read by the app, with the columns of its queries
+TABLES = {
+    "dishes": "meal_id int primary key, dish text, category text, restaurant text",
+    "co2": "meal_id int, co2 float",
+    "biowaste": "meal_id int, waste float",
+    "pieces_per_dish": "date date, meal_id int, pcs int",
+    "pieces_whole": "date date, restaurant text, pcs int",
+    "menu": (
+        "date date, restaurant text, dish_1 int, dish_2 int, dish_3 int,"
+        " dish_4 int, total_co2 float, total_waste float, total_pcs_from_dishes int,"
+        " co2_per_customer float, waste_per_customer float"
+    ),
+}
+CATEGORIES = ["fish", "chicken", "vegetarian", "meat", "vegan"]
+# Dates of the seeded rows
+SEED_START = "2024-05-01"
+SEED_DAYS = 61
+
+
+def make_models(
+    path_root: Path,
+    restaurants: list = DEFAULT_RESTAURANTS,
+    train_days: int = 48,
+    seed: int = 0,
+) -> Path:
+    """Fit and save a stand-in of every model loaded by ModelService.
+
+    Args:
+        path_root (Path): directory to save the models to, laid out as the
+            directory of the trained models.
+        restaurants (list, optional): restaurants to make models for.
+        train_days (int, optional): business days of random training data.
+        seed (int, optional): seed of the random training data.
+
+    Returns:
+        Path: `path_root`
+    """
+    from darts import TimeSeries
+    from darts.models import ARIMA, LightGBMModel, LinearRegressionModel
+    from skl2onnx import to_onnx
+    from sklearn.linear_model import Lasso
+    from sklearn.multioutput import MultiOutputRegressor
+    from xgboost import XGBRegressor
+
+    rng = np.random.default_rng(seed)
+    for model_name in ["receipt", "biowaste", "occupancy", "meal", "co2"]:
+        (path_root / model_name).mkdir(parents=True, exist_ok=True)
+
+    hours = pd.date_range(
+        "2024-03-01 10:00",
+        periods=9 * train_days,
+        freq=BUSINESS_HOURS,
+        name="datetime",
+    )
+    days = pd.bdate_range(end="2024-05-08", periods=2 * train_days, name="date")
+
+    for restaurant in restaurants:
+        for model_name, column in [
+            ("receipt", restaurant),
+            ("occupancy", "num_customer_in"),
+        ]:
+            series = TimeSeries.from_dataframe(
+                pd.DataFrame({column: rng.uniform(10, 100, len(hours))}, index=hours),
+                freq=BUSINESS_HOURS,
+            )
+            model = ARIMA(
+                p=1,
+                d=0,
+                q=0,
+                add_encoders={
+                    "cyclic": {"future": ["hour", "dayofweek"]},
+                    "datetime_attribute": {"future": ["hour", "dayofweek"]},
+                },
+            )
+            model.fit(series)
+            model.save(path_root / model_name / f"{restaurant}.pt")
+
+        for model_name, columns, lags in [
+            ("biowaste", BIOWASTE_COLUMNS, 5),
+            ("meal", MEAL_COLUMNS, 4),
+        ]:
+            series = TimeSeries.from_dataframe(
+                pd.DataFrame(
+                    rng.uniform(0, 50, (len(days), len(columns))),
+                    columns=columns,
+                    index=days,
+                ),
+                freq="B",
+            )
+            model = LinearRegressionModel(
+                lags=lags,
+                lags_past_covariates=5,
+                add_encoders={
+                    "cyclic": {"past": ["dayofweek"]},
+                    "datetime_attribute": {"past": ["dayofweek"]},
+                },
+            )
+            model.fit(series)
+            model.save(path_root / model_name / f"{restaurant}.pt")
+
+        X = rng.uniform(0, 300, (200, NUM_MEAL_TYPES)).astype(np.float32)
+
+        # Biowaste of the customers and of the kitchen
+        lasso = MultiOutputRegressor(Lasso()).fit(
+            X, np.stack([X.sum(1) * 0.01, X.sum(1) * 0.02], 1)
+        )
+        (path_root / f"biowaste/Jul24_Lasso_{restaurant}.onnx").write_bytes(
+            to_onnx(lasso, X[:1].astype(np.float64)).SerializeToString()
+        )
+
+        xgb = XGBRegressor(n_estimators=20, max_depth=3).fit(X, X.sum(1) * 0.5)
+        xgb.save_model(path_root / f"co2/Aug21_XGBoost_{restaurant}.json")
+
+    series = TimeSeries.from_dataframe(
+        pd.DataFrame(
+            {f"{r}_rcpts": rng.uniform(500, 1500, len(days)) for r in restaurants},
+            index=days,
+        ),
+        freq="B",
+    )
+    model = LightGBMModel(
+        lags=7,
+        lags_future_covariates=[0],
+        add_encoders={
+            "cyclic": {"future": ["dayofweek", "day", "month"]},
+            "datetime_attribute": {"future": ["dayofweek", "day", "month"]},
+        },
+        output_chunk_length=1,
+        verbose=-1,
+    )
+    model.fit(series)
+    model.save(path_root / "receipt/Jul_23_LightBGM.pt")
+
+    return path_root
+
+
+def seed_database(
+    restaurants: list = DEFAULT_RESTAURANTS,
+    start: str = SEED_START,
+    num_days: int = SEED_DAYS,
+    num_dishes: int = 200,
+    seed: float = 0.5,
+):
+    """Replace the tables of the app, in the database of `db`, with random rows.
+
+    Only meant for a throwaway database: the six tables of TABLES are dropped.
+
+    Args:
+        restaurants (list, optional): restaurants to make rows for.
+        start (str, optional): first date of the dated rows.
+        num_days (int, optional): number of dates of the dated rows.
+        num_dishes (int, optional): number of dishes.
+        seed (float, optional): seed of the random rows, between -1 and 1.
+    """
+    params = {
+        "restaurants": list(restaurants),
+        "start": start,
+        "num_days": num_days,
+        "num_dishes": num_dishes,
+        "categories": CATEGORIES,
+    }
+    dates = (
+        "generate_series(%(start)s::date,"
+        " %(start)s::date + (%(num_days)s - 1), '1 day') as d"
+    )
+
+    with db.get_pool().connection() as conn:
+        conn.execute("select setseed(%s)", [seed])
+
+        for table_name, columns in TABLES.items():
+            conn.execute(
+                sql.SQL("drop table if exists {}").format(sql.Identifier(table_name))
+            )
+            conn.execute(
+                sql.SQL("create table {} ({})").format(
+                    sql.Identifier(table_name), sql.SQL(columns)
+                )
+            )
+
+        conn.execute(
+            """
+            insert into dishes
+            select
+                i, 'dish ' || i, (%(categories)s::text[])[1 + i %% 5],
+                (%(restaurants)s::text[])[1 + i %% cardinality(%(restaurants)s::text[])]
+            from generate_series(1, %(num_dishes)s) as i
+            """,
+            params,
+        )
+        conn.execute(
+            """
+            insert into co2
+            select i, random() from generate_series(1, %(num_dishes)s) as i
+            """,
+            params,
+        )
+        conn.execute(
+            """
+            insert into biowaste
+            select i, random() * 50 from generate_series(1, %(num_dishes)s) as i
+            """,
+            params,
+        )
+        conn.execute(
+            f"""
+            insert into pieces_per_dish
+            select d::date, i, (random() * 100)::int
+            from {dates}, generate_series(1, %(num_dishes)s, 3) as i
+            """,
+            params,
+        )
+        conn.execute(
+            f"""
+            insert into pieces_whole
+            select d::date, r, (random() * 1000)::int
+            from {dates}, unnest(%(restaurants)s::text[]) as r
+            """,
+            params,
+        )
+        conn.execute(
+            f"""
+            insert into menu
+            select
+                d::date, r, m, m + 1, m + 2, m + 3, random(), random(),
+                (random() * 300)::int, random(), random()
+            from {dates}, unnest(%(restaurants)s::text[]) as r,
+                generate_series(1, 5) as m
+            """,
+            params,
+        )
+
+    db.invalidate_reference_cache()
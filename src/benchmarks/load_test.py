@@ -0,0 +1,393 @@
+"""Replays dashboard traffic against the app and reports its latency per route.
+
+Run with `invoke load-test`, or `python -m src.benchmarks.load_test [options]`.
+
+Clients send requests back to back, each over its own keep-alive connection. Their
+number is ramped up through `--stages`, each stage lasting `--duration` seconds.
+The requests are drawn from the weighted routes of `--mix` by a seeded random
+generator, so every run sends the same sequence, or replayed in order from
+`--replay`, a file of request paths (one per line, e.g. from an access log).
+
+The app at `--url` is tested, or with `--serve` the app started with gunicorn on
+synthetic models (see `fixtures.make_models`). `--seed-db` first replaces the tables
+of the database of the DB_* environment variables with seeded rows, which the
+/recommendation requests are drawn from.
+
+The clients share one Python process: run the test on other cores or another
+machine than the app, so that the clients are not the bottleneck.
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import pandas as pd
+from loguru import logger
+
+from src.services.restaurant_registry import DEFAULT_RESTAURANTS
+
+from . import fixtures
+from .runner import _git_commit
+
+# Weight of each kind of request in the traffic of the dashboard
+DEFAULT_MIX = {
+    "receipts": 20,
+    "biowaste": 10,
+    "occupancy": 20,
+    "meal": 10,
+    "all": 10,
+    "biowaste_from_meals": 10,
+    "biowaste_from_meals_image": 2,
+    "co2_from_meals": 10,
+    "recommendation": 8,
+}
+FORECAST_DAYS = [1, 3, 5, 7]
+MEAL_TYPES = ["num_fish", "num_chicken", "num_vegetarian", "num_meat", "num_vegan"]
+# Business days the forecasts from meals are asked for
+MEAL_DATES = [
+    date.strftime("%Y-%m-%d") for date in pd.bdate_range("2024-05-13", periods=40)
+]
+# Days of the seeded rows of the database
+DB_DATES = [
+    date.strftime("%Y-%m-%d")
+    for date in pd.date_range(fixtures.SEED_START, periods=fixtures.SEED_DAYS)
+]
+# A stage saturates the app when adding clients raised the throughput by less than
+# SATURATION_GAIN, or when more than MAX_ERROR_RATE of its requests failed
+SATURATION_GAIN = 0.1
+MAX_ERROR_RATE = 0.01
+REQUEST_TIMEOUT = 120
+
+
+def _meal_mix(rng: random.Random) -> str:
+    return "&".join(f"{meal_type}={rng.randint(0, 300)}" for meal_type in MEAL_TYPES)
+
+
+def _request_path(name: str, rng: random.Random, restaurants: list) -> str:
+    """Path of a random request of kind `name`, one of the keys of DEFAULT_MIX."""
+    if name in ["receipts", "biowaste", "occupancy", "meal", "all"]:
+        return f"/forecast/{name}?days={rng.choice(FORECAST_DAYS)}"
+
+    restaurant = rng.choice(restaurants)
+    if name in ["biowaste_from_meals", "biowaste_from_meals_image"]:
+        return_type = "image" if name.endswith("image") else "numeric"
+
+        return (
+            f"/forecast/biowaste_from_meals?restaurant={restaurant}"
+            f"&date={rng.choice(MEAL_DATES)}&return_type={return_type}&{_meal_mix(rng)}"
+        )
+    if name == "co2_from_meals":
+        return f"/forecast/co2_from_meals?restaurant={restaurant}&{_meal_mix(rng)}"
+    if name == "recommendation":
+        return f"/recommendation?restaurant={restaurant}&date={rng.choice(DB_DATES)}"
+
+    raise ValueError(f"Unknown kind of request: {name}")
+
+
+def generate_requests(mix: dict, restaurants: list, seed: int = 0):
+    """Yield (name, path) of random requests, in proportion to the weights of `mix`."""
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+
+    while True:
+        name = rng.choices(names, weights)[0]
+        yield name, _request_path(name, rng, restaurants)
+
+
+def replay_requests(lines: list):
+    """Yield (name, path) of the request paths of `lines` in a loop.
+
+    A line may start with the method, as in access logs: "GET /forecast/...".
+    """
+    paths = [line.split()[-1] for line in lines if line.strip()]
+    if len(paths) == 0:
+        raise ValueError("No request to replay")
+
+    for path in itertools.cycle(paths):
+        yield path.split("?")[0], path
+
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile `q` (between 0 and 100) of sorted `values`."""
+    return values[max(1, math.ceil(len(values) * q / 100)) - 1]
+
+
+def summarize(results: list, duration: float) -> dict:
+    """Throughput, error rate and latencies of (status, latency) results."""
+    latencies = sorted(latency for _, latency in results)
+    errors = sum(1 for status, _ in results if status is None or status >= 400)
+
+    statuses = {}
+    for status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    return {
+        "requests": len(results),
+        "throughput": len(results) / duration,
+        "error_rate": errors / len(results),
+        "statuses": statuses,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": latencies[-1],
+    }
+
+
+def saturation(stages: list, name: str = "total"):
+    """Lowest number of clients that saturates the app, or None if no stage did.
+
+    Args:
+        stages (list): results of the stages, by increasing number of clients.
+        name (str, optional): route whose results are compared, or "total".
+    """
+    previous = None
+    for stage in stages:
+        result = stage["routes"].get(name) if name != "total" else stage["total"]
+        if result is None:
+            continue
+
+        if result["error_rate"] > MAX_ERROR_RATE:
+            return stage["concurrency"]
+        if (
+            previous is not None
+            and result["throughput"] < (1 + SATURATION_GAIN) * previous["throughput"]
+        ):
+            return previous["concurrency"]
+
+        previous = {**result, "concurrency": stage["concurrency"]}
+
+    return None
+
+
+def _get(conn: http.client.HTTPConnection, path: str) -> int:
+    conn.request("GET", path)
+    resp = conn.getresponse()
+    resp.read()
+
+    return resp.status
+
+
+def _client(host: str, port: int, requests, lock, deadline: float, results: list):
+    conn = http.client.HTTPConnection(host, port, timeout=REQUEST_TIMEOUT)
+
+    while time.perf_counter() < deadline:
+        with lock:
+            name, path = next(requests)
+
+        start = time.perf_counter()
+        try:
+            status = _get(conn, path)
+        except http.client.RemoteDisconnected:
+            # The server closed the idle connection, e.g. a recycled worker: like
+            # browsers, send the request again on a new one
+            conn.close()
+            try:
+                status = _get(conn, path)
+            except (OSError, http.client.HTTPException):
+                status = None
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            status = None
+            conn.close()
+        # list.append is atomic, the clients share the list without a lock
+        results.append((name, status, time.perf_counter() - start))
+
+    conn.close()
+
+
+def run_stage(url: str, requests, concurrency: int, duration: float) -> dict:
+    """Send the `requests` with `concurrency` clients during `duration` seconds."""
+    parts = urlsplit(url)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    results = []
+
+    clients = [
+        threading.Thread(
+            target=_client,
+            args=(parts.hostname, parts.port or 80, requests, lock, deadline, results),
+        )
+        for _ in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - start
+
+    per_route = {}
+    for name, status, latency in results:
+        per_route.setdefault(name, []).append((status, latency))
+
+    return {
+        "concurrency": concurrency,
+        "duration": elapsed,
+        "total": summarize([(s, latency) for _, s, latency in results], elapsed),
+        "routes": {
+            name: summarize(route_results, elapsed)
+            for name, route_results in sorted(per_route.items())
+        },
+    }
+
+
+def serve(path_models: Path, port: int) -> subprocess.Popen:
+    """Start the app with gunicorn on `path_models`, and wait until it answers."""
+    env = {
+        **os.environ,
+        "FLASK_ENV": "production",
+        "TRAINED_MODELS_DIR": str(path_models),
+        "GUNICORN_BIND": f"127.0.0.1:{port}",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py"]
+        + ["src.app.app:app"],
+        env=env,
+    )
+
+    deadline = time.monotonic() + REQUEST_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"The app exited with code {server.returncode}")
+
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        try:
+            conn.request("GET", "/metrics")
+            if conn.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.5)
+        finally:
+            conn.close()
+
+    server.terminate()
+    raise RuntimeError("The app did not start in time")
+
+
+def run(
+    url: str,
+    stages: list,
+    duration: float,
+    requests,
+    warmup: float = 10,
+) -> dict:
+    """Run the stages of increasing `concurrency` after a warm-up stage.
+
+    The warm-up stage loads the models and fills the caches of the app. Its results
+    are not reported.
+
+    Returns:
+        dict: results of every stage, and saturation point of every route
+    """
+    if warmup > 0:
+        logger.info(f"Warm up with {stages[0]} clients for {warmup}s")
+        run_stage(url, requests, stages[0], warmup)
+
+    results = []
+    for concurrency in stages:
+        logger.info(f"Load with {concurrency} clients for {duration}s")
+        stage = run_stage(url, requests, concurrency, duration)
+        results.append(stage)
+
+        total = stage["total"]
+        logger.info(
+            f"{concurrency} clients: {total['throughput']:.1f} req/s, "
+            f"p95 {total['p95'] * 1000:.1f} ms, p99 {total['p99'] * 1000:.1f} ms, "
+            f"errors {total['error_rate']:.2%}"
+        )
+
+    names = sorted({name for stage in results for name in stage["routes"]})
+
+    return {
+        "stages": results,
+        "saturation": {name: saturation(results, name) for name in ["total", *names]},
+    }
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="app to test")
+    parser.add_argument("--serve", action="store_true", help="start the app to test")
+    parser.add_argument("--port", type=int, default=5055, help="port of --serve")
+    parser.add_argument(
+        "--stages", default="1,2,4,8,16", help="comma-separated numbers of clients"
+    )
+    parser.add_argument("--duration", type=float, default=30, help="seconds/stage")
+    parser.add_argument("--warmup", type=float, default=10, help="seconds")
+    parser.add_argument("--mix", type=Path, help="JSON weights of DEFAULT_MIX keys")
+    parser.add_argument("--replay", type=Path, help="file of request paths")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the requests")
+    parser.add_argument(
+        "--restaurants",
+        default=",".join(DEFAULT_RESTAURANTS),
+        help="comma-separated restaurants of the requests",
+    )
+    parser.add_argument(
+        "--seed-db",
+        action="store_true",
+        help="replace the tables of the database with seeded rows",
+    )
+    parser.add_argument("--output", type=Path, help="file to write the results to")
+    args = parser.parse_args(argv)
+
+    restaurants = args.restaurants.split(",")
+    stages = [int(concurrency) for concurrency in args.stages.split(",")]
+
+    mix = DEFAULT_MIX
+    if args.mix is not None:
+        mix = json.loads(args.mix.read_text())
+    if args.replay is not None:
+        requests = replay_requests(args.replay.read_text().splitlines())
+    else:
+        requests = generate_requests(mix, restaurants, args.seed)
+
+    if args.seed_db:
+        fixtures.seed_database(restaurants)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        url = args.url
+        if args.serve:
+            logger.info("Make synthetic models")
+            server = serve(fixtures.make_models(Path(tmp), restaurants), args.port)
+            url = f"http://127.0.0.1:{args.port}"
+
+        try:
+            report = run(url, stages, args.duration, requests, args.warmup)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    meta = {
+        "commit": _git_commit(),
+        "url": url,
+        "stages": stages,
+        "duration": args.duration,
+        "mix": None if args.replay is not None else mix,
+        "replay": None if args.replay is None else str(args.replay),
+        "seed": args.seed,
+    }
+
+    text = json.dumps({"meta": meta, **report}, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        args.output.write_text(text + "\n")
+        logger.info(f"Wrote the results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""Benchmarks ModelService, the database fetches and the routes of the app.
+
+Run with `invoke benchmark`, or `python -m src.benchmarks.runner [options]`.
+
+The models are synthetic stand-ins made by `fixtures.make_models`, unless `--models`
+gives a directory of trained models. The database cases run against the database of
+the DB_* environment variables, seeded with random rows if `--seed-db` is given, and
+are skipped if it cannot be reached.
+
+The results are written as JSON: the statistics of every case in seconds under
+"results", and what they were measured with under "meta". `--compare` prints the
+change of the median of every case from an earlier output.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+
+from loguru import logger
+
+HORIZONS = (1, 5, 30, 90)
+FORECAST_METHODS = (
+    "forecast_receipt",
+    "forecast_biowaste",
+    "forecast_occupancy",
+    "forecast_sold_meals",
+    "forecast_all",
+)
+BATCH_SIZE = 100
+# Date of the forecasts from meals, a few business days after the stand-in data
+DATE = "2024-06-03"
+MEAL_MIX = {
+    "num_fish": 10.0,
+    "num_chicken": 20.0,
+    "num_vegetarian": 30.0,
+    "num_meat": 40.0,
+    "num_vegan": 50.0,
+}
+
+
+def summarize(durations: list) -> dict:
+    """Statistics of a list of durations, in seconds."""
+    durations = sorted(durations)
+
+    return {
+        "count": len(durations),
+        "min": durations[0],
+        "median": statistics.median(durations),
+        "p95": durations[math.ceil(0.95 * len(durations)) - 1],
+        "max": durations[-1],
+        "mean": statistics.fmean(durations),
+    }
+
+
+def measure(func, repeat: int) -> dict:
+    """Call `func` once, then `repeat` times more, and summarize the durations.
+
+    The first call is reported on its own as `first`: it includes what is loaded or
+    cached on first use, which the other calls reuse.
+    """
+    start = time.perf_counter()
+    func()
+    first = time.perf_counter() - start
+
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+
+    return {"first": first, **summarize(durations)}
+
+
+def compare(baseline: dict, current: dict) -> dict:
+    """Ratio of the current to the baseline median of every case run in both."""
+    return {
+        name: result["median"] / baseline["results"][name]["median"]
+        for name, result in current["results"].items()
+        if name in baseline["results"] and baseline["results"][name]["median"] > 0
+    }
+
+
+def bench_model_service(repeat: int) -> dict:
+    from src.services.model_service import ModelService
+
+    results = {}
+
+    # The libraries of the models are imported by the first loads, which are not
+    # part of the load time of a model
+    ModelService(executor="thread").registry.warm(1)
+
+    start = time.perf_counter()
+    service = ModelService(executor="thread")
+    results["model_service/init"] = summarize([time.perf_counter() - start])
+
+    load_timings = {}
+    for (model_name, _), duration in service.registry.warm(1).items():
+        load_timings.setdefault(model_name, []).append(duration)
+    for model_name, durations in load_timings.items():
+        results[f"model_load/{model_name}"] = summarize(durations)
+
+    for method in FORECAST_METHODS:
+        for num_of_days in HORIZONS:
+            results[f"{method}/days={num_of_days}"] = measure(
+                partial(getattr(service, method), num_of_days), repeat
+            )
+
+    restaurant = next(iter(service.restaurants))
+    for return_type in ["numeric", "image"]:
+        results[f"forecast_biowaste_with_meal/{return_type}"] = measure(
+            partial(
+                service.forecast_biowaste_with_meal,
+                restaurant,
+                **MEAL_MIX,
+                date=DATE,
+                return_type=return_type,
+            ),
+            repeat,
+        )
+    results["forecast_co2_with_meal"] = measure(
+        partial(service.forecast_co2_with_meal, restaurant, **MEAL_MIX), repeat
+    )
+
+    meal_mixes = [
+        {"restaurant": name, "date": DATE, **MEAL_MIX}
+        for name in service.restaurants
+        for _ in range(BATCH_SIZE // len(service.restaurants))
+    ]
+    results[f"forecast_biowaste_with_meal_batch/size={len(meal_mixes)}"] = measure(
+        partial(service.forecast_biowaste_with_meal_batch, meal_mixes), repeat
+    )
+    results[f"forecast_co2_with_meal_batch/size={len(meal_mixes)}"] = measure(
+        partial(service.forecast_co2_with_meal_batch, meal_mixes), repeat
+    )
+
+    service.shutdown()
+
+    return results
+
+
+def bench_db(repeat: int, restaurant: str) -> dict:
+    from src.services import db
+
+    results = {}
+
+    if db.fetch("dishes") is None:
+        logger.warning("Cannot reach the database, skip its benchmarks")
+
+        return results
+
+    # Measured from the database, not from the copy cached by the check above
+    db.invalidate_reference_cache()
+
+    filters = {"date": DATE, "restaurant": restaurant}
+    for table_name, requires in db.fetch_infos.items():
+        kwargs = {r: filters[r] for r in requires}
+        results[f"db.fetch/{table_name}"] = measure(
+            partial(db.fetch, table_name, **kwargs), repeat
+        )
+        results[f"db.fetch_chunks/{table_name}"] = measure(
+            lambda table_name=table_name, kwargs=kwargs: list(
+                db.fetch_chunks(table_name, **kwargs)
+            ),
+            repeat,
+        )
+
+    results["db.fetch_recommendation"] = measure(
+        partial(db.fetch_recommendation, DATE, restaurant), repeat
+    )
+
+    return results
+
+
+def bench_routes(repeat: int, with_db: bool) -> dict:
+    os.environ.setdefault("FLASK_ENV", "development")
+
+    from src.app.app import app
+    from src.app.routes import model
+
+    client = app.test_client()
+    restaurant = next(iter(model.restaurants))
+    query = "&".join(f"{name}={num}" for name, num in MEAL_MIX.items())
+    meal_mixes = [{"restaurant": restaurant, "date": DATE, **MEAL_MIX}] * BATCH_SIZE
+
+    requests = {
+        "/forecast/receipts?days=5": None,
+        "/forecast/biowaste?days=5": None,
+        "/forecast/occupancy?days=5": None,
+        "/forecast/meal?days=5": None,
+        "/forecast/all?days=5": None,
+        "/forecast/all?days=5&format=columnar": None,
+        f"/forecast/biowaste_from_meals?restaurant={restaurant}&date={DATE}"
+        f"&return_type=numeric&{query}": None,
+        f"/forecast/co2_from_meals?restaurant={restaurant}&{query}": None,
+        "/forecast/biowaste_from_meals/batch": meal_mixes,
+        "/forecast/co2_from_meals/batch": meal_mixes,
+        "/metrics": None,
+    }
+    if with_db:
+        requests[f"/recommendation?restaurant={restaurant}&date={DATE}"] = None
+
+    results = {}
+    for url, body in requests.items():
+        route = url.split("?")[0]
+        name = f"GET {route}" if body is None else f"POST {route}"
+        if "format=columnar" in url:
+            name += "?format=columnar"
+
+        results[name] = measure(partial(_send, client, url, body), repeat)
+
+    return results
+
+
+def _send(client, url: str, body: list = None):
+    if body is None:
+        resp = client.get(url)
+    else:
+        resp = client.post(url, json=body)
+
+    if resp.status_code != 200:
+        raise RuntimeError(f"{url} answered {resp.status_code}")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(
+    path_models: Path = None,
+    repeat: int = 10,
+    seed_db: bool = False,
+    with_db: bool = True,
+) -> dict:
+    """Run every benchmark.
+
+    Args:
+        path_models (Path, optional): directory of trained models. Defaults to
+            synthetic models made in a temporary directory.
+        repeat (int, optional): calls per case after the first one.
+        seed_db (bool, optional): replace the tables of the database with random
+            rows first. Defaults to False.
+        with_db (bool, optional): run the database cases. Defaults to True.
+
+    Returns:
+        dict: "meta" and "results" of the benchmarks
+    """
+    from src.services import model_service
+    from src.services.restaurant_registry import RestaurantRegistry
+
+    from . import fixtures
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if path_models is None:
+            logger.info("Make synthetic models")
+            model_service.ModelService.PATH_ROOT_TRAINED_MODEL = fixtures.make_models(
+                Path(tmp)
+            )
+        else:
+            model_service.ModelService.PATH_ROOT_TRAINED_MODEL = path_models
+
+        restaurants = list(
+            RestaurantRegistry.discover(
+                model_service.ModelService.PATH_ROOT_TRAINED_MODEL
+            )
+        )
+        if seed_db:
+            fixtures.seed_database(restaurants)
+
+        results = bench_model_service(repeat)
+        db_results = bench_db(repeat, restaurants[0]) if with_db else {}
+        results.update(db_results)
+        results.update(bench_routes(repeat, with_db=len(db_results) > 0))
+
+    meta = {
+        "commit": _git_commit(),
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "models": "synthetic" if path_models is None else str(path_models),
+        "repeat": repeat,
+        "forecast_executor": model_service.FORECAST_EXECUTOR,
+    }
+
+    return {"meta": meta, "results": results}
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, help="file to write the results to")
+    parser.add_argument("--repeat", type=int, default=10, help="calls per case")
+    parser.add_argument("--models", type=Path, help="directory of trained models")
+    parser.add_argument(
+        "--seed-db",
+        action="store_true",
+        help="replace the tables of the database with random rows",
+    )
+    parser.add_argument(
+        "--no-db", action="store_true", help="skip the database benchmarks"
+    )
+    parser.add_argument("--compare", type=Path, help="results to compare with")
+    args = parser.parse_args(argv)
+
+    report = run(args.models, args.repeat, args.seed_db, with_db=not args.no_db)
+
+    text = json.dumps(report, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        args.output.write_text(text + "\n")
+        logger.info(f"Wrote the results to {args.output}")
+
+    if args.compare is not None:
+        ratios = compare(json.loads(args.compare.read_text()), report)
+        for name, ratio in ratios.items():
+            print(f"{ratio:6.2f}x  {name}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
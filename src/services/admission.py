@@ -0,0 +1,86 @@
+"""Creates AdmissionLimiter class that bounds the concurrent model calls."""
+
+import threading
+import time
+
+from .metrics import Histogram
+
+QUEUE_WAIT_SECONDS = Histogram(
+    "fwo_admission_queue_wait_seconds",
+    "Time waited for a free slot by an admitted call",
+)
+
+
+class Rejected(Exception):
+    """Raised when a call is not admitted.
+
+    Attributes:
+        reason (str): "queue_full" if the queue was full, "timeout" if no slot freed
+            up in time.
+    """
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class AdmissionLimiter:
+    """Runs at most `max_concurrent` calls at once, and queues the others.
+
+    A call is rejected right away when `max_queue` calls are already waiting, and
+    after `queue_timeout` seconds if no slot freed up meanwhile. Calls admitted while
+    others wait are queued too, so that slots go to the waiters first.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.rejected = {"queue_full": 0, "timeout": 0}
+        self._cond = threading.Condition()
+
+    def call(self, func, *args, **kwargs):
+        """Return `func(*args, **kwargs)` once admitted.
+
+        Raises:
+            Rejected: if the call is not admitted.
+        """
+        self._acquire()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._cond:
+                self.active -= 1
+                self._cond.notify()
+
+    def _acquire(self):
+        with self._cond:
+            if self.active < self.max_concurrent and self.waiting == 0:
+                self.active += 1
+                QUEUE_WAIT_SECONDS.observe(0)
+
+                return
+
+            if self.waiting >= self.max_queue:
+                self.rejected["queue_full"] += 1
+                raise Rejected("queue_full", "Too many requests waiting, retry later")
+
+            start = time.perf_counter()
+            deadline = start + self.queue_timeout
+            self.waiting += 1
+            try:
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self.rejected["timeout"] += 1
+                        raise Rejected("timeout", "Service busy, retry later")
+
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+
+            self.active += 1
+
+        QUEUE_WAIT_SECONDS.observe(time.perf_counter() - start)
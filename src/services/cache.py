@@ -0,0 +1,77 @@
+"""Creates the in-process caches shared by the services."""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe mapping keeping at most `max_size` most recently used entries."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+
+                return default
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+
+            return self._entries[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class TTLCache(LRUCache):
+    """LRUCache whose entries also expire `ttl` seconds after being stored."""
+
+    def __init__(self, max_size: int, ttl: float):
+        super().__init__(max_size)
+        self.ttl = ttl
+
+    def get(self, key, default=None):
+        entry = super().get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            with self._lock:
+                # Count the expired entry as a miss, not as a hit
+                self.hits -= 1
+                self.misses += 1
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+
+            return default
+
+        return value
+
+    def put(self, key, value):
+        super().put(key, (time.monotonic() + self.ttl, value))
@@ -1,10 +1,15 @@
 import os
+import threading
+from functools import partial
 
 import pandas as pd
 import psycopg as pg
 from loguru import logger
 from psycopg import sql
-from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
+
+from .cache import TTLCache
+from .metrics import Histogram
 
 USER = os.getenv("DB_USER", None)
 PWD = os.getenv("DB_PWD", None)
@@ -12,6 +17,18 @@ PORT = os.getenv("DB_PORT", None)
 HOST = os.getenv("DB_HOST", None)
 DB_NAME = os.getenv("DB_NAME", None)
 
+POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # Wait for a free connection
+POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "600"))
+CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "10000"))
+# Rows read from a result at a time, and transposed into its columns
+FETCH_CHUNK_SIZE = int(os.getenv("DB_FETCH_CHUNK_SIZE", "10000"))
+
+REFERENCE_CACHE_TTL = float(os.getenv("DB_REFERENCE_CACHE_TTL", "300"))
+REFERENCE_CACHE_SIZE = int(os.getenv("DB_REFERENCE_CACHE_SIZE", "16"))
+
 fetch_infos = {
     "biowaste": [],
     "co2": [],
@@ -21,18 +38,62 @@ fetch_infos = {
     "menu": ["date", "restaurant"],
 }
 
+_pool = None
+_pool_lock = threading.Lock()
+
+QUERY_SECONDS = Histogram(
+    "fwo_db_query_duration_seconds", "Duration of a database fetch, per query"
+)
+
+# Tables without filter keys hold slowly-changing reference data, which is kept in
+# memory for REFERENCE_CACHE_TTL seconds instead of being read on every fetch
+reference_cache = TTLCache(REFERENCE_CACHE_SIZE, REFERENCE_CACHE_TTL)
+
+
+def get_pool() -> ConnectionPool:
+    """Return the connection pool of this process, creating it on first use.
+
+    The pool is created lazily so that no connection is opened at import time, nor
+    shared between processes forked after the import.
+    """
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                kwargs={
+                    "user": USER,
+                    "password": PWD,
+                    "host": HOST,
+                    "port": PORT,
+                    "dbname": DB_NAME,
+                    "connect_timeout": CONNECT_TIMEOUT,
+                    "options": f"-c statement_timeout={STATEMENT_TIMEOUT_MS}",
+                },
+                min_size=POOL_MIN_SIZE,
+                max_size=POOL_MAX_SIZE,
+                timeout=POOL_TIMEOUT,
+                max_idle=POOL_MAX_IDLE,
+                check=ConnectionPool.check_connection,
+                name="fwo-db",
+            )
+
+        return _pool
+
+
+def close_pool():
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
 
 def db_connect(func):
     def func_inner(*args, **kwargs):
         try:
-            with pg.connect(
-                user=USER,
-                password=PWD,
-                host=HOST,
-                port=PORT,
-                dbname=DB_NAME,
-                row_factory=dict_row,
-            ) as conn:
+            with get_pool().connection() as conn:
                 with conn.cursor() as cur:
                     return func(cur=cur, conn=conn, *args, **kwargs)
 
@@ -44,34 +105,297 @@ def db_connect(func):
     return func_inner
 
 
-@db_connect
-def fetch(table_name: str, **kwargs):
-    assert table_name in fetch_infos
-    requires = fetch_infos[table_name]
+def _to_dataframe(names: list, chunks) -> pd.DataFrame:
+    """Build a DataFrame column by column from chunks of tuple rows.
+
+    Each chunk is transposed into the columns once read, so the rows of a result are
+    never all held at once, nor converted into one dict per row.
+
+    Args:
+        names (list): names of the columns.
+        chunks (iterable): lists of tuple rows, e.g. read by `_chunks`.
+    """
+    columns = [[] for _ in names]
+    for rows in chunks:
+        for column, values in zip(columns, zip(*rows)):
+            column.extend(values)
+
+    return pd.DataFrame(dict(zip(names, columns)), columns=names)
+
+
+def _chunks(cur, chunksize: int = FETCH_CHUNK_SIZE):
+    while rows := cur.fetchmany(chunksize):
+        yield rows
+
+
+def _read_dataframe(cur) -> pd.DataFrame:
+    """Read the result of `cur` into a DataFrame."""
+    return _to_dataframe([c.name for c in cur.description], _chunks(cur))
+
 
-    # Compose SQL
-    query = """
+def _compose_fetch_query(table_name: str) -> sql.Composed:
+    query = sql.SQL(
+        """
         select
             *
         from
             {table}
         where 1=1
     """
-    for r in requires:
-        query += f" and {r} = {{{r}}}"
-    query += ";"
+    ).format(table=sql.Identifier(table_name))
 
-    # logger.debug(query)
+    for r in fetch_infos[table_name]:
+        query += sql.SQL(" and {column} = {value}").format(
+            column=sql.Identifier(r), value=sql.Placeholder(r)
+        )
+
+    return query + sql.SQL(";")
+
+
+# The queries only differ by their parameters, so they are composed once and
+# prepared on the server by each pooled connection
+fetch_queries = {
+    table_name: _compose_fetch_query(table_name) for table_name in fetch_infos
+}
+
+
+def invalidate_reference_cache(table_name: str = None):
+    """Drop the cached copy of `table_name`, or of every table if not given."""
+    if table_name is None:
+        reference_cache.clear()
+    else:
+        reference_cache.pop(table_name)
+        if table_name in DISHES_INFO_SOURCES:
+            reference_cache.pop("dishes_info")
+
+
+def fetch(table_name: str, **kwargs):
+    """Fetch the rows of `table_name` matching the filters of `fetch_infos`.
+
+    Args:
+        table_name (str): one of the tables of `fetch_infos`.
+
+    Returns:
+        pd.DataFrame: fetched rows, or None if the database cannot be reached
+    """
+    if fetch_infos.get(table_name) != []:
+        return _fetch(table_name, **kwargs)
+
+    ret = _fetch_reference(table_name)
+    if ret is None:
+        return None
+
+    # Callers get their own copy, so they cannot alter the cached table
+    return ret.copy()
+
+
+def _fetch_reference(table_name: str):
+    """Return the cached rows of the reference table `table_name`, not to be modified."""
+    return _cached_reference(table_name, partial(_fetch, table_name))
+
+
+def _cached_reference(key: str, fetch_rows):
+    """Return the reference data cached under `key`, calling `fetch_rows()` if none.
+
+    Nothing is cached if `fetch_rows()` returns None, e.g. when the database cannot be
+    reached.
+    """
+    ret = reference_cache.get(key)
+    if ret is None:
+        ret = fetch_rows()
+
+        if ret is not None:
+            reference_cache.put(key, ret)
+
+    return ret
+
+
+@db_connect
+def _fetch(table_name: str, **kwargs):
+    assert table_name in fetch_infos
+    requires = fetch_infos[table_name]
 
     # Trigger query
     cur = kwargs["cur"]
 
-    stmt = sql.SQL(query).format(
-        table=sql.Identifier(table_name), **{r: kwargs[r] for r in requires}
+    with QUERY_SECONDS.time(query=table_name):
+        cur.execute(
+            fetch_queries[table_name], {r: kwargs[r] for r in requires}, prepare=True
+        )
+
+        ret = _read_dataframe(cur)
+
+    return ret
+
+
+def fetch_chunks(table_name: str, chunksize: int = FETCH_CHUNK_SIZE, **kwargs):
+    """Yield the rows of `table_name` matching the filters of `fetch_infos`, as
+    DataFrames of at most `chunksize` rows.
+
+    The rows are read through a server-side cursor, so only one chunk is transferred
+    and held in memory at a time, e.g. to process a table too large for `fetch`.
+
+    Raises:
+        psycopg.OperationalError: if the database cannot be reached.
+    """
+    assert table_name in fetch_infos
+    requires = fetch_infos[table_name]
+
+    with get_pool().connection() as conn:
+        with conn.cursor(name=f"fetch_{table_name}") as cur:
+            cur.execute(fetch_queries[table_name], {r: kwargs[r] for r in requires})
+
+            names = [c.name for c in cur.description]
+            for rows in _chunks(cur, chunksize):
+                yield _to_dataframe(names, [rows])
+
+
+# Columns returned by /recommendation, the ones read by the frontend
+DISHES_INFO_COLUMNS = [
+    "meal_id",
+    "dish",
+    "category",
+    "restaurant",
+    "co2",
+    "waste",
+    "pcs_per_dish",
+]
+MENUS_INFO_COLUMNS = [
+    "dish_1",
+    "dish_2",
+    "dish_3",
+    "dish_4",
+    "total_co2",
+    "total_waste",
+    "total_pcs_from_dishes",
+    "co2_per_customer",
+    "waste_per_customer",
+]
+# Columns of the reference tables making up the dishes of /recommendation
+DISHES_INFO_SOURCES = {
+    "dishes": ["meal_id", "dish", "category", "restaurant"],
+    "co2": ["meal_id", "co2"],
+    "biowaste": ["meal_id", "waste"],
+}
+
+
+def _columns(names: list) -> sql.Composed:
+    return sql.SQL(", ").join(map(sql.Identifier, names))
+
+
+# The dishes with their co2 and biowaste, joined in the database. The result is kept
+# in the reference cache, so a recommendation only joins the pieces sold that day.
+dishes_info_query = sql.SQL(
+    """
+        select
+            {columns}
+        from
+            dishes
+            join co2 using (meal_id)
+            join biowaste using (meal_id)
+        order by meal_id;
+    """
+).format(
+    columns=sql.SQL(", ").join(
+        [sql.Identifier("dishes", "meal_id")]
+        + [
+            sql.Identifier(table_name, column)
+            for table_name, columns in DISHES_INFO_SOURCES.items()
+            for column in columns
+            if column != "meal_id"
+        ]
     )
-    cur.execute(stmt)
+)
+
+
+# Queries of the data of the day behind /recommendation. Filters run in the database
+# and only the columns shown to the user are returned. The columns are listed, so
+# that the prepared statements keep their result shape if a table gains a column.
+recommendation_queries = {
+    "pieces_per_dish": sql.SQL(
+        """
+        select
+            meal_id,
+            pcs as pcs_per_dish
+        from
+            pieces_per_dish
+        where date = %(date)s;
+    """
+    ),
+    "menus_info": sql.SQL(
+        """
+        select
+            {columns}
+        from
+            menu
+        where date = %(date)s and restaurant = %(restaurant)s;
+    """
+    ).format(columns=_columns(MENUS_INFO_COLUMNS)),
+    "pieces_whole": sql.SQL(
+        """
+        select
+            pcs
+        from
+            pieces_whole
+        where date = %(date)s and restaurant = %(restaurant)s;
+    """
+    ),
+}
+
+
+def fetch_recommendation(date: str, restaurant: str) -> dict:
+    """Fetch the data of the menu recommendation.
+
+    The dishes joined with their co2 and biowaste come from the reference cache, and
+    the data of the day from one round trip, sending the queries together in pipeline
+    mode.
+
+    Args:
+        date (str): date of the menus.
+        restaurant (str): name of the restaurant.
+
+    Returns:
+        dict: DataFrames "dishes_info", "menus_info" and "pieces_whole", or None if
+            the database cannot be reached
+    """
+    dishes_info = _cached_reference("dishes_info", _fetch_dishes_info)
+    if dishes_info is None:
+        return None
+
+    ret = _fetch_recommendation_day(date=date, restaurant=restaurant)
+    if ret is None:
+        return None
+
+    # Inner join, so dishes not sold that day are left out
+    dishes_info = dishes_info.merge(ret.pop("pieces_per_dish"), on="meal_id")
+
+    return {"dishes_info": dishes_info[DISHES_INFO_COLUMNS], **ret}
+
+
+@db_connect
+def _fetch_dishes_info(**kwargs) -> pd.DataFrame:
+    cur = kwargs["cur"]
+
+    with QUERY_SECONDS.time(query="dishes_info"):
+        cur.execute(dishes_info_query, prepare=True)
+
+        ret = _read_dataframe(cur)
+
+    return ret
+
+
+@db_connect
+def _fetch_recommendation_day(date: str, restaurant: str, **kwargs) -> dict:
+    conn = kwargs["conn"]
+    params = {"date": date, "restaurant": restaurant}
+
+    with QUERY_SECONDS.time(query="recommendation"):
+        cursors = {}
+        with conn.pipeline():
+            for name, query in recommendation_queries.items():
+                cursors[name] = conn.cursor()
+                cursors[name].execute(query, params, prepare=True)
 
-    ret = cur.fetchall()
-    ret = pd.DataFrame.from_records(ret)
+        ret = {name: _read_dataframe(cur) for name, cur in cursors.items()}
 
     return ret
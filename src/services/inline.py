@@ -0,0 +1,38 @@
+"""Lets a request run the work of the thread and process pools in its own thread.
+
+The predictions and charts are submitted to pools with `submit`. Between `start()`
+and `stop()`, e.g. while a request is profiled, they run in the calling thread
+instead, where a profiler of that thread sees them.
+"""
+
+import contextvars
+from concurrent.futures import Future
+
+_inline = contextvars.ContextVar("inline", default=False)
+
+
+def start() -> contextvars.Token:
+    """Run the work submitted by the current thread in it, until `stop(token)`."""
+    return _inline.set(True)
+
+
+def stop(token: contextvars.Token):
+    _inline.reset(token)
+
+
+def active() -> bool:
+    return _inline.get()
+
+
+def submit(executor, fn, *args, **kwargs) -> Future:
+    """Return `executor.submit(fn, *args, **kwargs)`, or run `fn` now if `active()`."""
+    if not active():
+        return executor.submit(fn, *args, **kwargs)
+
+    future = Future()
+    try:
+        future.set_result(fn(*args, **kwargs))
+    except BaseException as e:
+        future.set_exception(e)
+
+    return future
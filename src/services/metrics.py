@@ -0,0 +1,123 @@
+"""Creates the metrics of the app, exposed in the Prometheus text format."""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# From 1 ms to 10 s, the range of a cached forecast up to a cold model load
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+_metrics = []
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in labels.items()
+    )
+
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Histogram:
+    """Distribution of observed values, e.g. durations, per set of label values."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+        _metrics.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        i = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+
+            series[0][i] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the code run in the block, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            series = [
+                (key, list(counts), total)
+                for key, (counts, total) in self._series.items()
+            ]
+
+        for key, counts, total in series:
+            labels = dict(key)
+
+            cumulated = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulated += count
+                yield f"{self.name}_bucket", {**labels, "le": bound}, cumulated
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulated
+
+
+class Collected:
+    """Values read when the metrics are exposed, e.g. the hits counted by a cache.
+
+    `collect` is called without arguments and returns (labels, value) pairs.
+    """
+
+    def __init__(self, name: str, documentation: str, type: str, collect):
+        self.name = name
+        self.documentation = documentation
+        self.type = type
+        self.collect = collect
+
+        _metrics.append(self)
+
+    def samples(self):
+        for labels, value in self.collect():
+            yield self.name, labels, value
+
+
+def expose() -> str:
+    """Return every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,111 @@
+"""Creates ModelRegistry class that loads trained models on first use."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+
+class ModelRegistry:
+    """Keeps the loaders of the trained models and loads each model lazily.
+
+    Models are identified by a key such as ("receipt", "Chemicum"). A model is
+    loaded the first time it is requested, or ahead of time with `warm()`, and
+    the time spent loading it is kept in `load_timings`.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self.load_timings = {}
+
+    def register(self, key, loader):
+        """Register the function loading the model identified by `key`.
+
+        Args:
+            key (tuple): identifier of the model, e.g. ("receipt", "Chemicum").
+            loader (callable): called without arguments, returns the loaded model.
+        """
+        with self._lock:
+            self._loaders[key] = loader
+            self._models.pop(key, None)
+            self._key_locks.setdefault(key, threading.Lock())
+
+    def keys(self) -> list:
+        with self._lock:
+            return list(self._loaders)
+
+    def is_loaded(self, key) -> bool:
+        with self._lock:
+            return key in self._models
+
+    def get(self, key):
+        """Return the model identified by `key`, loading it if not done yet."""
+        with self._lock:
+            if key in self._models:
+                return self._models[key]
+            if key not in self._loaders:
+                raise KeyError(f"No model registered for {key}")
+            key_lock = self._key_locks[key]
+
+        # Only one thread loads a given model, the others wait for it
+        with key_lock:
+            with self._lock:
+                if key in self._models:
+                    return self._models[key]
+                if key not in self._loaders:
+                    raise KeyError(f"No model registered for {key}")
+                loader = self._loaders[key]
+
+            start = time.perf_counter()
+            model = loader()
+            duration = time.perf_counter() - start
+
+            with self._lock:
+                self._models[key] = model
+                self.load_timings[key] = duration
+
+        logger.info(f"Loaded model {key} in {duration:.3f}s")
+
+        return model
+
+    def warm(self, max_workers: int = None, keys: list = None) -> dict:
+        """Load the registered models in a thread pool.
+
+        Args:
+            max_workers (int, optional): size of the thread pool. Defaults to the
+                ThreadPoolExecutor default.
+            keys (list, optional): keys of the models to load. Defaults to all.
+
+        Returns:
+            dict: load time in seconds per model key
+        """
+        if keys is None:
+            keys = self.keys()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="model-loader"
+        ) as executor:
+            list(executor.map(self.get, keys))
+
+        logger.info(f"Warmed {len(keys)} models in {time.perf_counter() - start:.3f}s")
+
+        with self._lock:
+            return dict(self.load_timings)
+
+    def after_fork(self):
+        """Recreate the locks in a forked process, where they may be held forever."""
+        self._lock = threading.Lock()
+        self._key_locks = {key: threading.Lock() for key in self._loaders}
+
+    def clear(self):
+        """Forget every registered loader and loaded model."""
+        with self._lock:
+            self._loaders = {}
+            self._models = {}
+            self._key_locks = {}
+            self.load_timings = {}
@@ -1,57 +1,577 @@
 """Creates ModelService class that allows requests to AI models."""
 
-import io
+import gc
+import inspect
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import partial, wraps
 from pathlib import Path
 
-import matplotlib.pyplot as plt
 import numpy as np
-import onnxruntime as rt
 import pandas as pd
-import seaborn as sns
-from darts.models import ARIMA, LightGBMModel, LinearRegressionModel
 from loguru import logger
-from xgboost import XGBRegressor
 
-RESTAURANTS = ["Chemicum", "Physicum", "Exactum"]
+from . import inline
+from .admission import AdmissionLimiter
+from .metrics import Histogram
+from .model_registry import ModelRegistry
+from .model_watcher import ModelWatcher, snapshot_files
+from .restaurant_registry import RestaurantRegistry
+from .single_flight import SingleFlight
+
+# The model frameworks (darts, xgboost, onnxruntime) and the plotting libraries take
+# seconds to import, so they are imported when first needed, by the model loaders
+# and by `ModelService.renderer`
+
+TRAINED_MODELS_DIR = os.getenv("TRAINED_MODELS_DIR", "/trained_models")
 NUM_TIMESTAMP_PER_DAY = (
     9  # Since each day, the predictions' timestamp are 10 AM, 11 AM... 15 PM
 )
+MAX_CACHED_FORECAST_DAYS = int(os.getenv("MAX_CACHED_FORECAST_DAYS", "30"))
+# Number of business days from DATE_FIRST_PREDICT covered by the receipt-per-day table
+RECEIPT_PER_DAY_HORIZON = int(os.getenv("RECEIPT_PER_DAY_HORIZON", "1000"))
+DATE_FIRST_PREDICT = "2024-05-09"  # The day after the last available date in data
+# How the forecast of each day-horizon model is post-processed and returned
+FORECASTS = {
+    "receipt": {
+        "steps_per_day": NUM_TIMESTAMP_PER_DAY,
+        "index_name": "datetime",
+        "date_format": r"%Y-%m-%d %H:%M:%S",
+        "components": None,
+    },
+    "biowaste": {
+        "steps_per_day": 1,
+        "index_name": "date",
+        "date_format": r"%Y-%m-%d",
+        "components": [
+            "amnt_waste_customer",
+            "amnt_waste_coffee",
+            "amnt_waste_kitchen",
+            "amnt_waste_hall",
+        ],
+    },
+    "occupancy": {
+        "steps_per_day": NUM_TIMESTAMP_PER_DAY,
+        "index_name": "datetime",
+        "date_format": r"%Y-%m-%d %H:%M:%S",
+        "components": None,
+    },
+    "meal": {
+        "steps_per_day": 1,
+        "index_name": "date",
+        "date_format": r"%Y-%m-%d",
+        "components": [
+            "num_fish",
+            "num_chicken",
+            "num_vegetable",
+            "num_meat",
+            "num_NotMapped",
+            "num_vegan",
+        ],
+    },
+}
+# Series of forecast_all(), named as their routes, and their model
+FORECAST_SERIES = {
+    "receipts": "receipt",
+    "biowaste": "biowaste",
+    "occupancy": "occupancy",
+    "meal": "meal",
+}
+MEAL_TYPES = ["num_fish", "num_chicken", "num_vegetarian", "num_meat", "num_vegan"]
+WARM_MODELS_ON_STARTUP = os.getenv("WARM_MODELS_ON_STARTUP", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+MODEL_LOADER_WORKERS = int(os.getenv("MODEL_LOADER_WORKERS", "4"))
+# Predictions of the restaurants run in parallel, one per core at most. With the
+# "process" executor the models run in worker processes, out of reach of the GIL.
+FORECAST_EXECUTOR = os.getenv("FORECAST_EXECUTOR", "thread")
+FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Forecasts computed at once per process. Others wait in a queue of
+# FORECAST_QUEUE_SIZE, and are rejected when it is full or after
+# FORECAST_QUEUE_TIMEOUT seconds.
+MAX_CONCURRENT_FORECASTS = int(
+    os.getenv("MAX_CONCURRENT_FORECASTS", str(FORECAST_WORKERS))
+)
+FORECAST_QUEUE_SIZE = int(os.getenv("FORECAST_QUEUE_SIZE", "32"))
+FORECAST_QUEUE_TIMEOUT = float(os.getenv("FORECAST_QUEUE_TIMEOUT", "10"))
+# Seconds a forecast waits for the predictions of its restaurants before raising
+# concurrent.futures.TimeoutError. A stuck prediction keeps its thread of the pool
+# busy, but no longer holds the request.
+FORECAST_TIMEOUT = float(os.getenv("FORECAST_TIMEOUT", "60"))
+# Latest date forecasted from meals, in business days from DATE_FIRST_PREDICT. Later
+# dates need a rollout of the receipt-per-day model beyond its cached table.
+MAX_MEAL_FORECAST_BUSINESS_DAYS = int(
+    os.getenv("MAX_MEAL_FORECAST_BUSINESS_DAYS", str(RECEIPT_PER_DAY_HORIZON))
+)
+PRELOAD_SHARED_MODELS = os.getenv("PRELOAD_SHARED_MODELS", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# Seconds between two checks of the trained-model directory for new models, 0 to
+# never reload them
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "0"))
+# Models that can be loaded before the server forks its workers. ONNX Runtime,
+# XGBoost and LightGBM start native thread pools that do not survive a fork, so
+# those (small) models are loaded by each worker instead.
+SHARED_MODEL_FAMILIES = ("receipt", "biowaste", "occupancy", "meal")
 
 
-class ModelService:
-    """Class for handling the connection between models, data and the app."""
+PREDICT_SECONDS = Histogram(
+    "fwo_model_predict_duration_seconds", "Duration of a model prediction, per model"
+)
 
-    PATH_ROOT_TRAINED_MODEL = Path("/trained_models")
 
-    def __init__(self):
-        # data is fetched every time init is run, this should not happen\
-        self.models = {
-            "receipt": {},
-            "biowaste": {},
-            "occupancy": {},
-            "meal": {},
-            "receipt_per_day": None,
-            "biowaste_from_meal": {},
-            "co2_from_meal": {},
+class ForecastCache:
+    """Keeps the longest-horizon forecast of each frozen model in memory.
+
+    The day-horizon models are not refitted while the app runs, so a forecast of
+    `n` steps is the head of any longer forecast. The cache predicts
+    `max_days` once per model and serves shorter horizons by slicing. Longer
+    horizons are predicted on every call, and counted in `bypasses`. Reloaded models
+    come with a new cache, so cached forecasts are never invalidated.
+    """
+
+    def __init__(self, max_days: int = MAX_CACHED_FORECAST_DAYS):
+        self.max_days = max_days
+        self._forecasts = {}
+        self._lock = threading.Lock()
+        self.in_flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    def get(self, key, num_of_days: int, steps_per_day: int, predict):
+        """Return the forecast of `num_of_days` for the model identified by `key`.
+
+        Args:
+            key (tuple): identifier of the model, e.g. ("receipt", "Chemicum").
+            num_of_days (int): requested forecasting horizon in days.
+            steps_per_day (int): number of predicted timestamps per day.
+            predict (callable): called with a number of steps to run the model.
+
+        Returns:
+            TimeSeries: forecast of `num_of_days * steps_per_day` steps
+        """
+        num_steps = num_of_days * steps_per_day
+        if num_of_days > self.max_days:
+            with self._lock:
+                self.bypasses += 1
+
+            return predict(num_steps)
+
+        forecast = self.get_or_compute(
+            key, lambda: predict(self.max_days * steps_per_day)
+        )
+
+        return forecast[:num_steps]
+
+    def get_or_compute(self, key, compute):
+        """Return the value cached under `key`, calling `compute()` if there is none."""
+        with self._lock:
+            value = self._forecasts.get(key)
+
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if value is None:
+            # Concurrent misses of a key wait for a single computation
+            value = self.in_flight.do(key, compute)
+
+            with self._lock:
+                self._forecasts[key] = value
+
+        return value
+
+    def after_fork(self):
+        """Recreate the locks in a forked process, where they may be held forever."""
+        self._lock = threading.Lock()
+        self.in_flight = SingleFlight()
+
+
+_worker_service = None
+
+
+def _init_forecast_worker(path_root_trained_model: Path):
+    global _worker_service
+
+    ModelService.PATH_ROOT_TRAINED_MODEL = path_root_trained_model
+    # The process is spawned, so there are no workers to share its models with
+    _worker_service = ModelService(executor="thread", preload=False)
+
+
+def _predict_in_worker(model_name: str, restaurant: str, num_steps: int):
+    model = _worker_service._model(model_name, restaurant)
+
+    return _worker_service._predict_frame(model_name, model, num_steps)
+
+
+def _results(futures: dict, deadline: float) -> dict:
+    """Wait for the result of each future of `futures` until the `deadline`.
+
+    Args:
+        futures (dict): futures by key, e.g. by restaurant.
+        deadline (float): `time.monotonic()` after which waiting is given up.
+
+    Raises:
+        concurrent.futures.TimeoutError: if a result is not ready by the deadline.
+            The futures not started yet are cancelled.
+    """
+    try:
+        return {
+            key: future.result(timeout=max(0.0, deadline - time.monotonic()))
+            for key, future in futures.items()
         }
-        self._load_receipt_forecaster()
-        self._load_biowaste_forecaster()
-        self._load_occupancy_forecaster()
-        self._load_meal_forecaster()
+    except FutureTimeoutError:
+        for future in futures.values():
+            future.cancel()
+        raise
+
+
+def _coalesced(method):
+    """Make concurrent calls of `method` with the same arguments share one call.
+
+    The shared call runs once admitted by the limiter of the service, so the calls
+    waiting for it do not take a slot.
+
+    The arguments are bound to the signature of `method`, so that a call passing an
+    argument by keyword, or leaving its default, shares the call passing it by
+    position. Lists are compared as tuples.
+    """
+    signature = inspect.signature(method)
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        key = (method.__name__,) + tuple(
+            (name, tuple(value) if isinstance(value, list) else value)
+            for name, value in bound.arguments.items()
+            if name != "self"
+        )
+
+        return self.in_flight.do(key, self.limiter.call, method, self, *args, **kwargs)
+
+    return wrapper
+
+
+def _limited(method):
+    """Run `method` once admitted by the limiter of the service."""
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self.limiter.call(method, self, *args, **kwargs)
+
+    return wrapper
+
+
+class ModelService:
+    """Class for handling the connection between models, data and the app."""
 
-        self._load_receipt_byday_forecaster()
-        self._load_biowaste_from_meal_forecaster()
-        self._load_co2_from_meal_forecaster()
+    PATH_ROOT_TRAINED_MODEL = Path(TRAINED_MODELS_DIR)
 
-        plt.style.use("seaborn-v0_8")
-        plt.rcParams.update({"font.size": 8})
+    def __init__(
+        self, executor: str = FORECAST_EXECUTOR, preload: bool = PRELOAD_SHARED_MODELS
+    ):
+        """
+        Args:
+            executor (str, optional): "thread" to predict in a thread pool, "process"
+                in a pool of spawned processes. Defaults to FORECAST_EXECUTOR.
+            preload (bool, optional): load the fork-safe models now, to share them
+                with forked workers, see `preload_shared_models`. Defaults to
+                PRELOAD_SHARED_MODELS.
+
+        Raises:
+            ValueError: if the executor is unknown.
+        """
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown forecast executor: {executor}")
+
+        # data is fetched every time init is run, this should not happen\
+        self._reload_lock = threading.Lock()
+        # Set in the master process of a pre-fork server, until forked
+        self._preforked = False
+        # Files the current models were loaded from
+        self._model_files = None
+        self._watcher = None
+        # Identical requests arriving together, e.g. when the dashboard opens in many
+        # browsers at once, run the models once
+        self.in_flight = SingleFlight()
+        self.limiter = self._new_limiter()
+        self.load_models()
+
+        if preload:
+            self.preload_shared_models()
+
+        self._renderer = None
+        self._renderer_lock = threading.Lock()
+        self._executor = self._new_executor()
+        self._process_pool = None
+        if executor == "process":
+            self._process_pool = self._new_process_pool()
 
         # self.data = data_repo.get_model_fit_data()
         # self.model = NeuralNetwork(
         #     data=self.data)
 
-    def _load_receipt_forecaster(self):
-        logger.info("Load trained receipt forecasting models for 3 restaurants")
+    def load_models(self):
+        """(Re)register every trained model and drop the forecasts made by the old ones.
+
+        Models are loaded on first use, unless WARM_MODELS_ON_STARTUP is set, in which
+        case they are all loaded in a thread pool right away.
+        """
+        model_files = snapshot_files(self.PATH_ROOT_TRAINED_MODEL)
+        restaurants, registry = self._register_models()
+        if WARM_MODELS_ON_STARTUP:
+            registry.warm(MODEL_LOADER_WORKERS)
+
+        self._swap_models(restaurants, registry, ForecastCache())
+        self._model_files = model_files
+
+    def reload_models(self) -> bool:
+        """Load the trained models from disk again, without interrupting the service.
+
+        The new models are all loaded, and their cached forecasts made, before
+        replacing the current ones, so requests never wait for a model to load nor
+        predict. If loading fails, the current models are kept.
+
+        Not done in the master process of a pre-fork server: the models it holds are
+        shared with its workers, which reload their own.
+
+        Returns:
+            bool: False if another reload was already running, or in the master
+                process of a pre-fork server
+        """
+        if self._preforked:
+            logger.warning("Models are not reloaded in the pre-fork master process")
+            return False
+
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+
+        try:
+            model_files = snapshot_files(self.PATH_ROOT_TRAINED_MODEL)
+            restaurants, registry = self._register_models()
+            timings = registry.warm(MODEL_LOADER_WORKERS)
+            forecast_cache = self._prime_forecasts(restaurants, registry)
+
+            self._swap_models(restaurants, registry, forecast_cache)
+            self._model_files = model_files
+
+            # Workers of the process pool hold the old models
+            if self._process_pool is not None:
+                process_pool, self._process_pool = (
+                    self._process_pool,
+                    self._new_process_pool(),
+                )
+                process_pool.shutdown(wait=False)
+
+            logger.info(f"Reloaded {len(timings)} models")
+        except Exception:
+            logger.exception("Reloading models failed, keep the current ones")
+        finally:
+            self._reload_lock.release()
+
+        return True
+
+    def reload_models_in_background(self) -> bool:
+        """Start `reload_models()` in a thread.
+
+        Returns:
+            bool: False if a reload was already running, or in the master process of
+                a pre-fork server
+        """
+        if self._preforked or self._reload_lock.locked():
+            return False
+
+        threading.Thread(
+            target=self.reload_models, name="model-reload", daemon=True
+        ).start()
+
+        return True
+
+    def watch_models(
+        self, interval: float = MODEL_WATCH_INTERVAL, snapshot: frozenset = None
+    ):
+        """Reload the models whenever the trained-model directory changes.
+
+        Args:
+            interval (float, optional): seconds between two checks of the directory.
+                Defaults to MODEL_WATCH_INTERVAL.
+            snapshot (frozenset, optional): files the current models were loaded from,
+                as returned by `snapshot_files`. Defaults to the ones found when the
+                models were last (re)loaded.
+        """
+        if snapshot is None:
+            snapshot = self._model_files
+
+        if self._watcher is None:
+            self._watcher = ModelWatcher(
+                self.PATH_ROOT_TRAINED_MODEL, self.reload_models, interval
+            )
+            self._watcher.start(snapshot)
+
+    def after_fork(self):
+        """Recreate the threads of the service in a forked worker process.
+
+        Threads do not survive a fork: the executors inherited from the parent would
+        wait forever for their workers, its model watcher would not run, and the locks
+        held by its threads at the time of the fork would never be released. Meant to
+        run in each worker of a pre-fork server, e.g. in gunicorn's `post_fork` hook.
+        """
+        self._preforked = False
+        self._reload_lock = threading.Lock()
+        self.registry.after_fork()
+        self.forecast_cache.after_fork()
+        self.in_flight = SingleFlight()
+        self.limiter = self._new_limiter()
+        self._renderer = None
+        self._renderer_lock = threading.Lock()
+        self._executor = self._new_executor()
+        if self._process_pool is not None:
+            self._process_pool = self._new_process_pool()
+
+        # The watcher is not started in the master process, which does not reload its
+        # models. Models changed since it loaded them are reloaded by the worker.
+        watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            self.watch_models(watcher.interval, snapshot=watcher.current)
+        elif MODEL_WATCH_INTERVAL > 0:
+            self.watch_models(MODEL_WATCH_INTERVAL)
+
+    def _register_models(self):
+        restaurants = RestaurantRegistry.discover(self.PATH_ROOT_TRAINED_MODEL)
+        registry = ModelRegistry()
+
+        loaders = {
+            "receipt": self._load_receipt_forecaster,
+            "biowaste": self._load_biowaste_forecaster,
+            "occupancy": self._load_occupancy_forecaster,
+            "meal": self._load_meal_forecaster,
+            "biowaste_from_meal": self._load_biowaste_from_meal_forecaster,
+            "co2_from_meal": self._load_co2_from_meal_forecaster,
+        }
+        for model_name, loader in loaders.items():
+            for restaurant in restaurants:
+                registry.register((model_name, restaurant), partial(loader, restaurant))
+        registry.register(
+            ("receipt_per_day", None), self._load_receipt_byday_forecaster
+        )
+
+        return restaurants, registry
+
+    def _prime_forecasts(
+        self, restaurants: RestaurantRegistry, registry: ModelRegistry
+    ) -> ForecastCache:
+        """Make the cached forecasts of the models of `registry` in a new cache."""
+        forecast_cache = ForecastCache()
+
+        for model_name, forecast in FORECASTS.items():
+            num_steps = forecast_cache.max_days * forecast["steps_per_day"]
+            for restaurant in restaurants:
+                model = registry.get((model_name, restaurant))
+                forecast_cache.get_or_compute(
+                    (model_name, restaurant),
+                    partial(self._predict_frame, model_name, model, num_steps),
+                )
+
+        model = registry.get(("receipt_per_day", None))
+        forecast_cache.get_or_compute(
+            ("receipt_per_day", None), partial(self._rollout_receipts_per_day, model)
+        )
+
+        return forecast_cache
+
+    def _swap_models(
+        self,
+        restaurants: RestaurantRegistry,
+        registry: ModelRegistry,
+        forecast_cache: ForecastCache,
+    ):
+        # The registry is replaced first, so that the restaurants being served always
+        # have a model. Forecasts still being made by the old models end up in the old
+        # cache, which is dropped.
+        self.registry = registry
+        self.restaurants = restaurants
+        self.forecast_cache = forecast_cache
+
+    def _new_limiter(self) -> AdmissionLimiter:
+        return AdmissionLimiter(
+            MAX_CONCURRENT_FORECASTS, FORECAST_QUEUE_SIZE, FORECAST_QUEUE_TIMEOUT
+        )
+
+    def _new_executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(
+            max_workers=FORECAST_WORKERS, thread_name_prefix="forecast"
+        )
+
+    def _new_process_pool(self) -> ProcessPoolExecutor:
+        # Spawned, not forked: the native thread pools of the loaded models do not
+        # survive a fork
+        return ProcessPoolExecutor(
+            max_workers=FORECAST_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_forecast_worker,
+            initargs=(self.PATH_ROOT_TRAINED_MODEL,),
+        )
+
+    def preload_shared_models(self):
+        """Load the fork-safe models so that forked workers share them.
+
+        Meant to run in the master process of a pre-fork server (e.g. with gunicorn's
+        `preload_app`). The loaded objects are moved to the permanent GC generation so
+        that garbage collections in the workers do not write to their memory pages,
+        which keeps those pages shared copy-on-write instead of duplicated per worker.
+        The models are then not reloaded until `after_fork()`.
+        """
+        keys = [key for key in self.registry.keys() if key[0] in SHARED_MODEL_FAMILIES]
+        self.registry.warm(MODEL_LOADER_WORKERS, keys=keys)
+
+        self._preforked = True
+
+        gc.collect()
+        gc.freeze()
+
+        logger.info(f"Preloaded {len(keys)} models shared with the worker processes")
+
+    def shutdown(self):
+        """Stop the model watcher, and the thread and process pools of the service."""
+        if self._watcher is not None:
+            self._watcher.stop()
+
+        self._executor.shutdown(wait=True)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=True)
+
+        if self._renderer is not None:
+            self._renderer.shutdown()
+
+    @property
+    def renderer(self):
+        """Chart renderer, created with the first chart."""
+        with self._renderer_lock:
+            if self._renderer is None:
+                from .render_service import ChartRenderer
+
+                self._renderer = ChartRenderer()
+
+        return self._renderer
+
+    def _model(self, model_name: str, restaurant: str = None):
+        return self.registry.get((model_name, restaurant))
+
+    def _load_receipt_forecaster(self, restaurant: str):
+        logger.info(f"Load trained receipt forecasting model for {restaurant}")
+
+        from darts.models import ARIMA
 
         model_name = "receipt"
         add_encoders = {
@@ -59,16 +579,16 @@ class ModelService:
             "datetime_attribute": {"future": ["hour", "dayofweek"]},
         }
 
-        for restaurant in RESTAURANTS:
-            path_model = (
-                ModelService.PATH_ROOT_TRAINED_MODEL / model_name / f"{restaurant}.pt"
-            )
-            self.models[model_name][restaurant] = ARIMA(add_encoders=add_encoders).load(
-                path_model
-            )
+        path_model = (
+            ModelService.PATH_ROOT_TRAINED_MODEL / model_name / f"{restaurant}.pt"
+        )
+
+        return ARIMA(add_encoders=add_encoders).load(path_model)
 
-    def _load_biowaste_forecaster(self):
-        logger.info("Load trained biowaste forecasting models for 3 restaurants")
+    def _load_biowaste_forecaster(self, restaurant: str):
+        logger.info(f"Load trained biowaste forecasting model for {restaurant}")
+
+        from darts.models import LinearRegressionModel
 
         add_encoders = {
             "cyclic": {"past": ["dayofweek"]},
@@ -76,16 +596,18 @@ class ModelService:
         }
         model_name = "biowaste"
 
-        for restaurant in RESTAURANTS:
-            path_model = (
-                ModelService.PATH_ROOT_TRAINED_MODEL / model_name / f"{restaurant}.pt"
-            )
-            self.models[model_name][restaurant] = LinearRegressionModel(
-                lags=5, lags_past_covariates=5, add_encoders=add_encoders
-            ).load(path_model)
+        path_model = (
+            ModelService.PATH_ROOT_TRAINED_MODEL / model_name / f"{restaurant}.pt"
+        )
+
+        return LinearRegressionModel(
+            lags=5, lags_past_covariates=5, add_encoders=add_encoders
+        ).load(path_model)
+
+    def _load_occupancy_forecaster(self, restaurant: str):
+        logger.info(f"Load trained occupancy forecasting model for {restaurant}")
 
-    def _load_occupancy_forecaster(self):
-        logger.info("Load trained occupancy forecasting models for 3 restaurants")
+        from darts.models import ARIMA
 
         model_name = "occupancy"
         add_encoders = {
@@ -93,16 +615,16 @@ class ModelService:
             "datetime_attribute": {"future": ["hour", "dayofweek"]},
         }
 
-        for restaurant in RESTAURANTS:
-            path_model = (
-                ModelService.PATH_ROOT_TRAINED_MODEL / model_name / f"{restaurant}.pt"
-            )
-            self.models[model_name][restaurant] = ARIMA(add_encoders=add_encoders).load(
-                path_model
-            )
+        path_model = (
+            ModelService.PATH_ROOT_TRAINED_MODEL / model_name / f"{restaurant}.pt"
+        )
+
+        return ARIMA(add_encoders=add_encoders).load(path_model)
 
-    def _load_meal_forecaster(self):
-        logger.info("Load trained meal forecasting models for 3 restaurants")
+    def _load_meal_forecaster(self, restaurant: str):
+        logger.info(f"Load trained meal forecasting model for {restaurant}")
+
+        from darts.models import LinearRegressionModel
 
         add_encoders = {
             "cyclic": {"past": ["dayofweek"]},
@@ -110,24 +632,26 @@ class ModelService:
         }
         model_name = "meal"
 
-        for restaurant in RESTAURANTS:
-            path_model = (
-                ModelService.PATH_ROOT_TRAINED_MODEL / model_name / f"{restaurant}.pt"
-            )
-            self.models[model_name][restaurant] = LinearRegressionModel(
-                lags=4, lags_past_covariates=5, add_encoders=add_encoders
-            ).load(path_model)
+        path_model = (
+            ModelService.PATH_ROOT_TRAINED_MODEL / model_name / f"{restaurant}.pt"
+        )
+
+        return LinearRegressionModel(
+            lags=4, lags_past_covariates=5, add_encoders=add_encoders
+        ).load(path_model)
 
     def _load_receipt_byday_forecaster(self):
         logger.info("Load trained receipt forecasting model by day")
 
+        from darts.models import LightGBMModel
+
         add_encoders = {
             "cyclic": {"future": ["dayofweek", "day", "month"]},
             "datetime_attribute": {"future": ["dayofweek", "day", "month"]},
         }
         path_model = ModelService.PATH_ROOT_TRAINED_MODEL / "receipt/Jul_23_LightBGM.pt"
 
-        self.models["receipt_per_day"] = LightGBMModel(
+        return LightGBMModel(
             lags=7,
             lags_future_covariates=[0],
             add_encoders=add_encoders,
@@ -135,170 +659,341 @@ class ModelService:
             verbose=-1,
         ).load(path_model)
 
-    def _load_biowaste_from_meal_forecaster(self):
-        logger.info("Load trained biowaste from meal forecasting models by restaurant")
+    def _load_biowaste_from_meal_forecaster(self, restaurant: str):
+        logger.info(
+            f"Load trained biowaste from meal forecasting model for {restaurant}"
+        )
 
-        for restaurant in RESTAURANTS:
-            path_model = (
-                ModelService.PATH_ROOT_TRAINED_MODEL
-                / f"biowaste/Jul24_Lasso_{restaurant}.onnx"
-            )
+        from .onnx_runtime import OnnxRegressor, create_session
+
+        path_model = (
+            ModelService.PATH_ROOT_TRAINED_MODEL
+            / f"biowaste/Jul24_Lasso_{restaurant}.onnx"
+        )
+
+        return OnnxRegressor(create_session(path_model))
 
-            self.models["biowaste_from_meal"][restaurant] = rt.InferenceSession(
-                path_model, providers=["CPUExecutionProvider"]
+    def _load_co2_from_meal_forecaster(self, restaurant: str):
+        logger.info(f"Load trained co2 from meal forecasting model for {restaurant}")
+
+        from .onnx_runtime import (
+            OnnxRegressor,
+            create_session,
+            file_sha256,
+            source_hash,
+        )
+
+        path_model = (
+            ModelService.PATH_ROOT_TRAINED_MODEL
+            / f"co2/Aug21_XGBoost_{restaurant}.json"
+        )
+
+        # Served by ONNX Runtime once exported with `invoke export-onnx`, as long as
+        # the XGBoost model was not retrained since
+        path_onnx = path_model.with_suffix(".onnx")
+        if path_onnx.exists():
+            session = create_session(path_onnx)
+            exported_from = source_hash(session)
+            if not path_model.exists() or exported_from == file_sha256(path_model):
+                return OnnxRegressor(session)
+
+            logger.warning(
+                f"{path_onnx} was not exported from the current {path_model}, serve "
+                "the latter until exported again"
             )
 
-    def _load_co2_from_meal_forecaster(self):
-        logger.info("Load trained co2 from meal forecasting models by restaurant")
+        assert path_model.exists()
+
+        from xgboost import XGBRegressor
+
+        regressor = XGBRegressor()
+        regressor.load_model(path_model)
+
+        return regressor
 
-        for restaurant in RESTAURANTS:
-            path_model = (
-                ModelService.PATH_ROOT_TRAINED_MODEL
-                / f"co2/Aug21_XGBoost_{restaurant}.json"
+    def _predict(
+        self, model_name: str, restaurant: str, num_of_days: int
+    ) -> pd.DataFrame:
+        """Post-processed forecast of one restaurant, indexed by formatted timestamp."""
+
+        def predict(num_steps: int) -> pd.DataFrame:
+            # Run here when inline, e.g. to be seen by the profiler of the request
+            if self._process_pool is not None and not inline.active():
+                return self._process_pool.submit(
+                    _predict_in_worker, model_name, restaurant, num_steps
+                ).result()
+
+            return self._predict_frame(
+                model_name, self._model(model_name, restaurant), num_steps
             )
 
-            assert path_model.exists()
+        return self.forecast_cache.get(
+            (model_name, restaurant),
+            num_of_days,
+            FORECASTS[model_name]["steps_per_day"],
+            predict,
+        )
+
+    def _predict_frame(self, model_name: str, model, num_steps: int) -> pd.DataFrame:
+        forecast = FORECASTS[model_name]
 
-            regressor = XGBRegressor()
-            regressor.load_model(path_model)
-            self.models["co2_from_meal"][restaurant] = regressor
+        with PREDICT_SECONDS.time(model=model_name):
+            pred = model.predict(num_steps)
+        components = forecast["components"] or list(pred.components[:1])
 
-    def _post_process(self, prediction):
-        if prediction <= 0:
-            prediction = 0.0
+        return pd.DataFrame(
+            self._post_process(pred[components].values()),
+            index=pred.time_index.strftime(forecast["date_format"]),
+            columns=components,
+        )
 
-        prediction = round(prediction, 2)
+    def _predict_restaurants(self, model_name: str, num_of_days: int) -> dict:
+        """Forecast `model_name` for every restaurant in parallel.
 
-        return prediction
+        Returns:
+            dict: forecast per restaurant, as returned by `_predict`
+        """
+        deadline = time.monotonic() + FORECAST_TIMEOUT
+        futures = {
+            restaurant: inline.submit(
+                self._executor, self._predict, model_name, restaurant, num_of_days
+            )
+            for restaurant in self.restaurants
+        }
 
-    def forecast_receipt(self, num_of_days: int = 5) -> list:
-        """Forecast the number of receipts `num_of_days` ahead
+        return _results(futures, deadline)
+
+    def _receipt_per_day_table(self) -> pd.DataFrame:
+        """Forecasted receipts per restaurant for RECEIPT_PER_DAY_HORIZON business days.
+
+        The LightGBM model is autoregressive, so forecasting a date means rolling out
+        every business day since DATE_FIRST_PREDICT. The rollout is done once per model
+        load and kept as a table indexed by date, one row per business day.
+        """
+        return self.forecast_cache.get_or_compute(
+            ("receipt_per_day", None),
+            lambda: self._rollout_receipts_per_day(self._model("receipt_per_day")),
+        )
+
+    def _rollout_receipts_per_day(self, model) -> pd.DataFrame:
+        with PREDICT_SECONDS.time(model="receipt_per_day"):
+            return model.predict(RECEIPT_PER_DAY_HORIZON).pd_dataframe()
+
+    def _predict_receipts_per_day(self, restaurant: str, n_bdays) -> np.ndarray:
+        """Look up the forecasted receipts of `restaurant` per business day offset.
 
         Args:
-            num_of_days (int, optional): The number of days for forecasting. Defaults to 5.
+            restaurant (str): name of the restaurant.
+            n_bdays (array-like): business days since DATE_FIRST_PREDICT, from 1.
 
         Returns:
-            list: forecasted receipt quantity per date per restaurant
+            np.ndarray: forecasted number of receipts per entry of `n_bdays`
         """
+        n_bdays = np.asarray(n_bdays)
+        table = self._receipt_per_day_table()
+
+        max_bdays = n_bdays.max().item()
+        if max_bdays <= len(table):
+            n_rpts = table[f"{restaurant}_rcpts"].to_numpy()
+        else:
+            out = self._model("receipt_per_day").predict(max_bdays)
+            n_rpts = out[f"{restaurant}_rcpts"].values()[:, 0]
+
+        return n_rpts[n_bdays - 1].astype(np.int32)
 
-        predictions = pd.DataFrame()
+    def business_days_to(self, date_pred: pd.Timestamp) -> int:
+        """Number of business days from DATE_FIRST_PREDICT to `date_pred`, included.
 
-        # Forecast the future
-        for restaurant in RESTAURANTS:
-            pred = self.models["receipt"][restaurant].predict(
-                num_of_days * NUM_TIMESTAMP_PER_DAY
+        Raises:
+            ValueError: if meals cannot be forecasted on `date_pred`: a weekend, a
+                date before DATE_FIRST_PREDICT, or one after
+                MAX_MEAL_FORECAST_BUSINESS_DAYS business days.
+        """
+        # Ensure the predicted day is not weekend
+        if date_pred.weekday() >= 5:
+            raise ValueError("Input date must not be weekend")
+
+        # Ensure the date must be greater or equal to '2024-05-09
+        n_bdays = np.busday_count(
+            DATE_FIRST_PREDICT, (date_pred.normalize() + pd.Timedelta(days=1)).date()
+        ).item()
+        if n_bdays <= 0:
+            raise ValueError("Input date not after 2024-05-08")
+        if n_bdays > MAX_MEAL_FORECAST_BUSINESS_DAYS:
+            raise ValueError(
+                f"Input date more than {MAX_MEAL_FORECAST_BUSINESS_DAYS} business days"
+                f" after {DATE_FIRST_PREDICT}"
             )
 
-            if len(predictions) == 0:
-                predictions["datetime"] = pred.time_index
+        return n_bdays
 
-            predictions.loc[:, restaurant] = [
-                self._post_process(x) for x in pred.values().squeeze().tolist()
-            ]
+    def _post_process(self, predictions: np.ndarray) -> np.ndarray:
+        predictions = np.where(predictions <= 0, 0.0, predictions)
 
-        # Post-process
-        predictions["datetime"] = predictions["datetime"].dt.strftime(
-            r"%Y-%m-%d %H:%M:%S"
-        )
+        return np.round(predictions, 2)
 
-        # Return
-        ret = predictions.to_dict("records")
+    def _forecast_records(self, model_name: str, preds: dict) -> list:
+        """Merge the forecasts of `model_name` of every restaurant per timestamp.
 
-        return ret
+        Args:
+            model_name (str): one of the models of FORECASTS, e.g. "receipt".
+            preds (dict): forecast per restaurant, as returned by `_predict`.
+
+        Returns:
+            list: one dict per forecasted timestamp, holding the forecast of every
+                restaurant as a number, or as a dict if the model has components
+        """
+        index_name = FORECASTS[model_name]["index_name"]
+        components = FORECASTS[model_name]["components"]
 
-    def forecast_biowaste(self, num_of_days: int = 5):
         predictions = {}
+        for restaurant, pred in preds.items():
+            if components is None:
+                values = pred.iloc[:, 0].tolist()
+            else:
+                values = [
+                    dict(zip(components, row)) for row in pred.to_numpy().tolist()
+                ]
 
-        # Forecast the future
-        for restaurant in RESTAURANTS:
-            pred = self.models["biowaste"][restaurant].predict(num_of_days)
-
-            df_pred = pred.pd_dataframe().reset_index()
-            df_pred["date"] = df_pred["date"].dt.strftime(r"%Y-%m-%d")
-
-            for row in df_pred.itertuples():
-                if row.date not in predictions:
-                    predictions[row.date] = {"date": row.date}
-
-                predictions[row.date] = {
-                    **predictions[row.date],
-                    restaurant: {
-                        "amnt_waste_customer": self._post_process(
-                            row.amnt_waste_customer
-                        ),
-                        "amnt_waste_coffee": self._post_process(row.amnt_waste_coffee),
-                        "amnt_waste_kitchen": self._post_process(
-                            row.amnt_waste_kitchen
-                        ),
-                        "amnt_waste_hall": self._post_process(row.amnt_waste_hall),
-                    },
-                }
+            for timestamp, value in zip(pred.index, values):
+                if timestamp not in predictions:
+                    predictions[timestamp] = {index_name: timestamp}
+
+                predictions[timestamp][restaurant] = value
 
-        # Return
         ret = list(predictions.values())
 
         return ret
 
-    def forecast_occupancy(self, num_of_days: int = 5) -> list:
-        """Forecast the number of occupancy from SuperSight data
+    def _forecast_columns(self, model_name: str, preds: dict) -> dict:
+        """Return the forecasts of `model_name` of every restaurant as one array each.
 
-        Args:
-            num_of_days (int, optional): _description_. Defaults to 5.
+        This columnar form does not repeat the restaurant and component names for
+        every timestamp, so it is much smaller than `_forecast_records`.
+
+        Returns:
+            dict: the timestamps under the index name of the model, and per
+                restaurant the array of forecasts, or a dict of arrays per
+                component. Missing forecasts are None.
         """
-        num_timesteps = NUM_TIMESTAMP_PER_DAY * num_of_days
+        index_name = FORECASTS[model_name]["index_name"]
+        components = FORECASTS[model_name]["components"]
+
+        # The restaurants are usually forecasted on the same timestamps, otherwise
+        # they are aligned on the union of them
+        index = next(iter(preds.values())).index
+        if not all(pred.index.equals(index) for pred in preds.values()):
+            aligned = pd.concat(preds, axis=1).sort_index()
+            aligned = aligned.astype(object).where(aligned.notna(), None)
+
+            index = aligned.index
+            preds = {restaurant: aligned[restaurant] for restaurant in preds}
+
+        ret = {index_name: index.tolist()}
+        for restaurant, pred in preds.items():
+            if components is None:
+                ret[restaurant] = pred.iloc[:, 0].tolist()
+            else:
+                ret[restaurant] = {
+                    component: pred[component].tolist() for component in components
+                }
 
-        predictions = {}
-        for restaurant in RESTAURANTS:
-            # Forecast
-            pred = self.models["occupancy"][restaurant].predict(num_timesteps)
+        return ret
 
-            # Post-process forecasted data
-            df_pred = pred.pd_dataframe().reset_index()
-            df_pred["datetime"] = df_pred["datetime"].dt.strftime(r"%Y-%m-%d %H:%M:%S")
+    def _forecast(
+        self, model_name: str, num_of_days: int, columnar: bool, preds: dict = None
+    ):
+        if preds is None:
+            preds = self._predict_restaurants(model_name, num_of_days)
 
-            for row in df_pred.itertuples():
-                if row.datetime not in predictions:
-                    predictions[row.datetime] = {"datetime": row.datetime}
+        if columnar:
+            return self._forecast_columns(model_name, preds)
 
-                predictions[row.datetime][restaurant] = self._post_process(
-                    row.num_customer_in
-                )
+        return self._forecast_records(model_name, preds)
 
-        ret = list(predictions.values())
+    @_coalesced
+    def forecast_receipt(self, num_of_days: int = 5, columnar: bool = False):
+        """Forecast the number of receipts `num_of_days` ahead
 
-        return ret
+        Args:
+            num_of_days (int, optional): The number of days for forecasting. Defaults to 5.
+            columnar (bool, optional): return one array per restaurant instead of one
+                dict per timestamp. Defaults to False.
 
-    def forecast_sold_meals(self, num_of_days: int = 5):
-        predictions = {}
+        Returns:
+            list: forecasted receipt quantity per date per restaurant
+        """
+        return self._forecast("receipt", num_of_days, columnar)
 
-        # Forecast the future
-        for restaurant in RESTAURANTS:
-            pred = self.models["meal"][restaurant].predict(num_of_days)
-
-            df_pred = pred.pd_dataframe().reset_index()
-            df_pred["date"] = df_pred["date"].dt.strftime(r"%Y-%m-%d")
-
-            for row in df_pred.itertuples():
-                if row.date not in predictions:
-                    predictions[row.date] = {"date": row.date}
-
-                predictions[row.date] = {
-                    **predictions[row.date],
-                    restaurant: {
-                        "num_fish": self._post_process(row.num_fish),
-                        "num_chicken": self._post_process(row.num_chicken),
-                        "num_vegetable": self._post_process(row.num_vegetable),
-                        "num_meat": self._post_process(row.num_meat),
-                        "num_NotMapped": self._post_process(row.num_NotMapped),
-                        "num_vegan": self._post_process(row.num_vegan),
-                    },
-                }
+    @_coalesced
+    def forecast_biowaste(self, num_of_days: int = 5, columnar: bool = False):
+        return self._forecast("biowaste", num_of_days, columnar)
 
-        # Return
-        ret = list(predictions.values())
+    @_coalesced
+    def forecast_occupancy(self, num_of_days: int = 5, columnar: bool = False):
+        """Forecast the number of occupancy from SuperSight data
+
+        Args:
+            num_of_days (int, optional): _description_. Defaults to 5.
+            columnar (bool, optional): return one array per restaurant instead of one
+                dict per timestamp. Defaults to False.
+        """
+        return self._forecast("occupancy", num_of_days, columnar)
+
+    @_coalesced
+    def forecast_sold_meals(self, num_of_days: int = 5, columnar: bool = False):
+        return self._forecast("meal", num_of_days, columnar)
+
+    @_coalesced
+    def forecast_all(
+        self, num_of_days: int = 5, series: list = None, columnar: bool = False
+    ) -> dict:
+        """Forecast several series at once, predicting them concurrently.
+
+        Every (model, restaurant) pair is predicted in the thread pool of the service,
+        so the call takes about as long as the slowest model instead of their sum.
+
+        Args:
+            num_of_days (int, optional): The number of days for forecasting. Defaults to 5.
+            series (list, optional): names among FORECAST_SERIES. Defaults to all.
+            columnar (bool, optional): return one array per restaurant instead of one
+                dict per timestamp. Defaults to False.
+
+        Returns:
+            dict: forecast per series name, as returned by the forecast_* methods
+        """
+        if series is None:
+            series = list(FORECAST_SERIES)
+
+        deadline = time.monotonic() + FORECAST_TIMEOUT
+        restaurants = list(self.restaurants)
+        futures = {
+            (name, restaurant): inline.submit(
+                self._executor,
+                self._predict,
+                FORECAST_SERIES[name],
+                restaurant,
+                num_of_days,
+            )
+            for name in series
+            for restaurant in restaurants
+        }
+        preds = _results(futures, deadline)
+
+        ret = {}
+        for name in series:
+            ret[name] = self._forecast(
+                FORECAST_SERIES[name],
+                num_of_days,
+                columnar,
+                preds={
+                    restaurant: preds[name, restaurant] for restaurant in restaurants
+                },
+            )
 
         return ret
 
+    @_coalesced
     def forecast_biowaste_with_meal(
         self,
         restaurant: str,
@@ -311,85 +1006,29 @@ class ModelService:
         return_type: str,
     ):
         # Predict no. receipts next day
-        date_pred = pd.to_datetime(date)
-
-        # Ensure the predicted day is not weekend
-        if date_pred.weekday() >= 5:
-            raise ValueError("Input date must not be weekend")
-
-        # Ensure the date must be greater or equal to '2024-05-09
-        DATE_FIRST_PREDICT = (
-            "2024-05-09"  # The day after the last available date in data
-        )
-        n_bdays = len(pd.bdate_range(start=DATE_FIRST_PREDICT, end=date_pred))
-        if n_bdays <= 0:
-            raise ValueError("Input date not after 2024-05-08")
-
-        out = self.models["receipt_per_day"].predict(n_bdays)
-
-        # logger.info(f"date_pred: {out.time_index[-1]}")
-
-        n_rpts = (
-            out[f"{restaurant}_rcpts"]
-            .data_array()[-1]
-            .to_numpy()
-            .squeeze()
-            .astype(np.int32)
-            .item()
-        )
+        n_bdays = self.business_days_to(pd.Timestamp(date))
+        n_rpts = self._predict_receipts_per_day(restaurant, [n_bdays])[0].item()
 
         # Predict waste
-        X_predict = pd.DataFrame(
-            {
-                "fish": [num_fish],
-                "chicken": [num_chicken],
-                "vegetarian": [num_vegetarian],
-                "meat": [num_meat],
-                "vegan": [num_vegan],
-            }
+        X_predict = np.array(
+            [[num_fish, num_chicken, num_vegetarian, num_meat, num_vegan]]
         )
 
-        sess = self.models["biowaste_from_meal"][restaurant]
-        input_name = sess.get_inputs()[0].name
-        label_name = sess.get_outputs()[0].name
-        pred_onx = sess.run([label_name], {input_name: X_predict.to_numpy()})[0]
+        model = self._model("biowaste_from_meal", restaurant)
+        with PREDICT_SECONDS.time(model="biowaste_from_meal"):
+            pred_onx = model.predict(X_predict)
 
         # Calculate the waste per customer
         amnt_waste_per_customer = pred_onx.sum() * 1000 / n_rpts
 
         ret = None
         if return_type == "image":
-            # Plot
-            fig = plt.figure(figsize=(10, 8))
-            fig.suptitle(f"Forecast in date: {date}", fontweight="bold", fontsize=14)
-
-            ax = fig.add_subplot(221)
-            sns.barplot(X_predict, ax=ax)
-            for i, val in enumerate(X_predict.to_numpy().squeeze().astype(np.int32)):
-                plt.text(i, val + 2, val, ha="center", fontsize=11)
-            ax.set_title("Input: number of meals per type", fontweight="bold")
-
-            ax = fig.add_subplot(222)
-            sns.barplot(x=["Customer", "Kitchen"], y=pred_onx.squeeze(), ax=ax)
-            for i, val in enumerate(pred_onx.squeeze()):
-                plt.text(i, val + 0.2, f"{val:.2f}", ha="center", fontsize=11)
-            ax.set_title("Predicted amount of waste per type", fontweight="bold")
-
-            ax = fig.add_subplot(223)
-            sns.barplot(x=["Num. receipts"], y=[n_rpts], ax=ax)
-            ax.set_title("Forecasted number of receipts (POS)", fontweight="bold")
-
-            ax = fig.add_subplot(224)
-            sns.barplot(x=["Amount"], y=[amnt_waste_per_customer], ax=ax)
-            ax.axhline(y=40, color="r", linestyle="-.")
-            ax.set_title("Amnt. waste per customer (in gram)", fontweight="bold")
-
-            # Export image
-            buf = io.BytesIO()
-            fig.savefig(buf, format="png", bbox_inches="tight")
-            buf.seek(0)
-
-            ret = buf.read()
+            X_predict = pd.DataFrame(
+                X_predict, columns=["fish", "chicken", "vegetarian", "meat", "vegan"]
+            )
+            ret = self.renderer.render_biowaste_with_meal(
+                date, X_predict, pred_onx.squeeze(), n_rpts, amnt_waste_per_customer
+            )
         elif return_type == "numeric":
             ret = {
                 "date": date,
@@ -403,6 +1042,7 @@ class ModelService:
 
         return ret
 
+    @_coalesced
     def forecast_co2_with_meal(
         self,
         restaurant: str,
@@ -426,12 +1066,85 @@ class ModelService:
             dtype=np.float32,
         )
 
-        model = self.models["co2_from_meal"][restaurant]
+        model = self._model("co2_from_meal", restaurant)
 
-        pred_co2 = model.predict(X_predict)
+        with PREDICT_SECONDS.time(model="co2_from_meal"):
+            pred_co2 = model.predict(X_predict)
 
         ret = {
             "predicted_co2": pred_co2.squeeze().item(),
         }
 
         return ret
+
+    @_limited
+    def forecast_biowaste_with_meal_batch(self, meal_mixes: list) -> list:
+        """Forecast the biowaste of many meal mixes with one model call per restaurant
+
+        Args:
+            meal_mixes (list): dicts with keys `restaurant`, `date` and the number of
+                meals per type (`num_fish`, `num_chicken`, `num_vegetarian`, `num_meat`,
+                `num_vegan`).
+
+        Returns:
+            list: numeric forecast per meal mix, in the same order as `meal_mixes`
+        """
+        df = pd.DataFrame.from_records(
+            meal_mixes, columns=["restaurant", "date", *MEAL_TYPES]
+        )
+        X_predict = df[MEAL_TYPES].to_numpy(dtype=np.float64)
+        n_bdays = np.array(
+            [self.business_days_to(pd.Timestamp(date)) for date in df["date"]],
+            dtype=np.int64,
+        )
+
+        pred_onx = np.empty((len(df), 2), dtype=np.float64)
+        n_rpts = np.empty(len(df), dtype=np.int32)
+        for restaurant, idx in df.groupby("restaurant").indices.items():
+            model = self._model("biowaste_from_meal", restaurant)
+            with PREDICT_SECONDS.time(model="biowaste_from_meal"):
+                pred_onx[idx] = model.predict(X_predict[idx])
+
+            n_rpts[idx] = self._predict_receipts_per_day(restaurant, n_bdays[idx])
+
+        # Calculate the waste per customer
+        amnt_waste_per_customer = pred_onx.sum(axis=1) * 1000 / n_rpts
+
+        ret = [
+            {
+                "restaurant": restaurant,
+                "date": date,
+                "predicted_waste_customer": pred_onx[i, 0].item(),
+                "predicted_waste_kitchen": pred_onx[i, 1].item(),
+                "predicted_num_receipts": n_rpts[i].item(),
+                "predicted_waste_per_customer": amnt_waste_per_customer[i].item(),
+            }
+            for i, (restaurant, date) in enumerate(zip(df["restaurant"], df["date"]))
+        ]
+
+        return ret
+
+    @_limited
+    def forecast_co2_with_meal_batch(self, meal_mixes: list) -> list:
+        """Forecast the co2 of many meal mixes with one model call per restaurant
+
+        Args:
+            meal_mixes (list): dicts with key `restaurant` and the number of meals per
+                type (`num_fish`, `num_chicken`, `num_vegetarian`, `num_meat`,
+                `num_vegan`).
+
+        Returns:
+            list: forecasted co2 per meal mix, in the same order as `meal_mixes`
+        """
+        df = pd.DataFrame.from_records(meal_mixes, columns=["restaurant", *MEAL_TYPES])
+        X_predict = df[MEAL_TYPES].to_numpy(dtype=np.float32)
+
+        pred_co2 = np.empty(len(df), dtype=np.float32)
+        for restaurant, idx in df.groupby("restaurant").indices.items():
+            model = self._model("co2_from_meal", restaurant)
+            with PREDICT_SECONDS.time(model="co2_from_meal"):
+                pred_co2[idx] = model.predict(X_predict[idx])
+
+        ret = [{"predicted_co2": co2} for co2 in pred_co2.tolist()]
+
+        return ret
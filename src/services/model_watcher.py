@@ -0,0 +1,89 @@
+"""Creates ModelWatcher class that detects new trained models on disk."""
+
+import threading
+from pathlib import Path
+
+from loguru import logger
+
+
+def snapshot_files(path_root: Path) -> frozenset:
+    """Return the path, size and modification time of every file under `path_root`."""
+    snapshot = []
+    for path in path_root.rglob("*"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        if path.is_file():
+            snapshot.append((str(path), stat.st_size, stat.st_mtime_ns))
+
+    return frozenset(snapshot)
+
+
+class ModelWatcher:
+    """Polls a directory of trained models and reports when its files changed.
+
+    Files are compared by path, size and modification time. A change is reported
+    once the directory stayed the same for one more poll, so that models still
+    being copied are not picked up half-written.
+    """
+
+    def __init__(self, path_root: Path, on_change, interval: float):
+        """
+        Args:
+            path_root (Path): directory of the trained models.
+            on_change (callable): called without arguments after a change.
+            interval (float): seconds between two polls.
+        """
+        self.path_root = path_root
+        self.on_change = on_change
+        self.interval = interval
+        self.current = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, snapshot: frozenset = None):
+        """Poll the directory in a daemon thread.
+
+        Args:
+            snapshot (frozenset, optional): files the current models were loaded from,
+                e.g. `current` of the watcher of a parent process. Defaults to the
+                files found now.
+        """
+        # Changes are detected from now on, not from when the thread gets to run
+        self.current = (
+            snapshot if snapshot is not None else snapshot_files(self.path_root)
+        )
+
+        self._thread = threading.Thread(
+            target=self._run, name="model-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        pending = None
+
+        while not self._stop.wait(self.interval):
+            snapshot = snapshot_files(self.path_root)
+
+            if snapshot == self.current:
+                pending = None
+            elif snapshot != pending:
+                # Changed since the last poll: wait for the copy to settle
+                pending = snapshot
+            else:
+                logger.info(f"Trained models changed in {self.path_root}")
+
+                try:
+                    self.on_change()
+                except Exception:
+                    logger.exception("Handling the change of trained models failed")
+
+                # Updated once handled, so that a process forked meanwhile still sees
+                # the change
+                self.current, pending = snapshot, None
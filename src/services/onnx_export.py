@@ -0,0 +1,93 @@
+"""Exports the trained co2 models to ONNX and checks that they predict the same.
+
+Run with `invoke export-onnx`, or `python -m src.services.onnx_export [path]` where
+`path` is the directory of the trained models.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+from onnxmltools import convert_xgboost
+from onnxmltools.convert.common.data_types import FloatTensorType
+from xgboost import XGBRegressor
+
+from .model_service import MEAL_TYPES, ModelService
+from .onnx_runtime import SOURCE_HASH_KEY, OnnxRegressor, create_session, file_sha256
+from .restaurant_registry import RestaurantRegistry
+
+TARGET_OPSET = 15
+PARITY_SAMPLES = 1000
+# Tree thresholds are float32 in both runtimes, only the summation order differs
+PARITY_RTOL = 1e-4
+PARITY_ATOL = 1e-3
+
+
+def check_parity(expected: np.ndarray, actual: np.ndarray):
+    """Raise ValueError if the ONNX predictions differ from the original model."""
+    if not np.allclose(actual, expected, rtol=PARITY_RTOL, atol=PARITY_ATOL):
+        diff = np.abs(actual - expected).max()
+        raise ValueError(f"ONNX predictions differ from the original by up to {diff}")
+
+
+def export_co2_model(path_root: Path, restaurant: str) -> Path:
+    """Export the XGBoost co2 model of `restaurant` next to it, as ONNX.
+
+    The SHA-256 of the XGBoost model is stored in the metadata of the export, under
+    SOURCE_HASH_KEY.
+
+    Returns:
+        Path: path of the exported model
+    """
+    path_model = path_root / f"co2/Aug21_XGBoost_{restaurant}.json"
+    path_onnx = path_model.with_suffix(".onnx")
+
+    # Hashed before loading, so a model replaced meanwhile is not marked as exported
+    source_sha256 = file_sha256(path_model)
+    regressor = XGBRegressor()
+    regressor.load_model(path_model)
+
+    onx = convert_xgboost(
+        regressor,
+        initial_types=[("input", FloatTensorType([None, len(MEAL_TYPES)]))],
+        target_opset=TARGET_OPSET,
+    )
+    # Lets the app tell an export of an older model apart
+    metadata = onx.metadata_props.add()
+    metadata.key, metadata.value = SOURCE_HASH_KEY, source_sha256
+
+    # Meal counts over the range seen in the menus
+    X = (
+        np.random.default_rng(0)
+        .uniform(0, 500, (PARITY_SAMPLES, len(MEAL_TYPES)))
+        .astype(np.float32)
+    )
+    path_tmp = path_onnx.with_suffix(".onnx.tmp")
+    path_tmp.write_bytes(onx.SerializeToString())
+    try:
+        check_parity(
+            regressor.predict(X), OnnxRegressor(create_session(path_tmp)).predict(X)
+        )
+    except ValueError:
+        path_tmp.unlink()
+        raise
+
+    # Renamed once complete, so a running app never loads a partial file
+    path_tmp.replace(path_onnx)
+    logger.info(f"Exported {path_model} to {path_onnx}")
+
+    return path_onnx
+
+
+def export_all(path_root: Path = ModelService.PATH_ROOT_TRAINED_MODEL) -> list:
+    restaurants = RestaurantRegistry.discover(path_root, served="")
+
+    return [export_co2_model(path_root, restaurant) for restaurant in restaurants]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        export_all(Path(sys.argv[1]))
+    else:
+        export_all()
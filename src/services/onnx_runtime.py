@@ -0,0 +1,113 @@
+"""Creates the ONNX Runtime sessions serving the exported models."""
+
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+import onnxruntime as rt
+
+# Each request runs one small model, so one thread per session avoids waking a
+# thread pool for microseconds of work; requests are parallel across threads
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "1"))
+ONNX_INTER_OP_THREADS = int(os.getenv("ONNX_INTER_OP_THREADS", "1"))
+ONNX_GRAPH_OPTIMIZATION = os.getenv("ONNX_GRAPH_OPTIMIZATION", "all")
+ONNX_ENABLE_MEM_ARENA = os.getenv("ONNX_ENABLE_MEM_ARENA", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": rt.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": rt.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": rt.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": rt.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+# NumPy type of the ONNX tensor types of the model inputs
+TENSOR_TYPES = {
+    "tensor(float)": np.float32,
+    "tensor(double)": np.float64,
+    "tensor(int64)": np.int64,
+    "tensor(int32)": np.int32,
+}
+
+# Metadata of an exported model holding the SHA-256 of the file it was exported from
+SOURCE_HASH_KEY = "source_sha256"
+
+
+def file_sha256(path: Path) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def source_hash(session: rt.InferenceSession) -> str:
+    """SHA-256 of the model file `session` was exported from, None if not recorded."""
+    return session.get_modelmeta().custom_metadata_map.get(SOURCE_HASH_KEY)
+
+
+def session_options(
+    intra_op_threads: int = ONNX_INTRA_OP_THREADS,
+    inter_op_threads: int = ONNX_INTER_OP_THREADS,
+    graph_optimization: str = ONNX_GRAPH_OPTIMIZATION,
+    enable_mem_arena: bool = ONNX_ENABLE_MEM_ARENA,
+) -> rt.SessionOptions:
+    """Options of the ONNX Runtime sessions, by default from the environment.
+
+    Args:
+        intra_op_threads (int, optional): threads running one operator.
+        inter_op_threads (int, optional): threads running operators in parallel.
+        graph_optimization (str, optional): one of GRAPH_OPTIMIZATION_LEVELS.
+        enable_mem_arena (bool, optional): keep the tensor memory between runs
+            instead of allocating it on each run.
+    """
+    options = rt.SessionOptions()
+    options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = inter_op_threads
+    options.execution_mode = rt.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[graph_optimization]
+    options.enable_cpu_mem_arena = enable_mem_arena
+
+    return options
+
+
+def create_session(
+    path_model: Path, options: rt.SessionOptions = None
+) -> rt.InferenceSession:
+    return rt.InferenceSession(
+        str(path_model),
+        sess_options=options or session_options(),
+        providers=["CPUExecutionProvider"],
+    )
+
+
+class OnnxRegressor:
+    """Regressor exported to ONNX, with the `predict` method of scikit-learn.
+
+    The names and type of the inputs and outputs are read once from the session, so
+    a prediction only converts its input, if needed, and runs the session.
+    """
+
+    def __init__(self, session: rt.InferenceSession):
+        self.session = session
+
+        model_input = session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_dtype = TENSOR_TYPES[model_input.type]
+        self.output_names = [session.get_outputs()[0].name]
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict the rows of `X`.
+
+        Returns:
+            np.ndarray: one prediction per row, or one row of predictions per row of
+                `X` for models with several targets
+        """
+        X = np.ascontiguousarray(X, dtype=self.input_dtype)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        pred = self.session.run(self.output_names, {self.input_name: X})[0]
+        if pred.ndim == 2 and pred.shape[1] == 1:
+            pred = pred.ravel()
+
+        return pred
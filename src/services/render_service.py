@@ -0,0 +1,139 @@
+"""Creates ChartRenderer class that renders the forecast charts as PNG images."""
+
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib import rcParams, style
+from matplotlib.figure import Figure
+
+from . import inline
+from .cache import LRUCache
+
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "256"))
+RENDER_TIMEOUT = float(os.getenv("RENDER_TIMEOUT", "30"))
+
+
+class ChartRenderer:
+    """Renders charts in a dedicated thread pool and caches the PNG images.
+
+    Images are cached by a hash of everything drawn on them, so identical inputs are
+    rendered once. Each worker thread owns one figure which is cleared and redrawn
+    for every chart, so no figure is ever left open by a request.
+    """
+
+    def __init__(
+        self, max_workers: int = RENDER_WORKERS, cache_size: int = RENDER_CACHE_SIZE
+    ):
+        style.use("seaborn-v0_8")
+        rcParams.update({"font.size": 8})
+
+        self.cache = LRUCache(cache_size)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="chart-renderer"
+        )
+        self._templates = threading.local()
+
+    def render_biowaste_with_meal(
+        self,
+        date: str,
+        X_predict: pd.DataFrame,
+        pred_waste: np.ndarray,
+        n_rpts: int,
+        amnt_waste_per_customer: float,
+    ) -> bytes:
+        """Render the forecast of `ModelService.forecast_biowaste_with_meal`.
+
+        Args:
+            date (str): forecasted date.
+            X_predict (pd.DataFrame): number of meals per type, one row.
+            pred_waste (np.ndarray): predicted customer and kitchen waste.
+            n_rpts (int): forecasted number of receipts.
+            amnt_waste_per_customer (float): predicted waste per customer in grams.
+
+        Returns:
+            bytes: the chart as a PNG image
+        """
+        key = hashlib.sha256(
+            repr(
+                (
+                    date,
+                    X_predict.columns.tolist(),
+                    X_predict.to_numpy().tolist(),
+                    np.asarray(pred_waste).tolist(),
+                    n_rpts,
+                    float(amnt_waste_per_customer),
+                )
+            ).encode()
+        ).hexdigest()
+
+        image = self.cache.get(key)
+        if image is None:
+            image = inline.submit(
+                self._executor,
+                self._draw_biowaste_with_meal,
+                date,
+                X_predict,
+                pred_waste,
+                n_rpts,
+                amnt_waste_per_customer,
+            ).result(timeout=RENDER_TIMEOUT)
+
+            self.cache.put(key, image)
+
+        return image
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+        self.cache.clear()
+
+    def _template(self):
+        # Figure of the calling worker thread, created on its first chart
+        if not hasattr(self._templates, "fig"):
+            fig = Figure(figsize=(10, 8))
+            axes = [fig.add_subplot(221 + i) for i in range(4)]
+            self._templates.fig, self._templates.axes = fig, axes
+
+        for ax in self._templates.axes:
+            ax.cla()
+
+        return self._templates.fig, self._templates.axes
+
+    def _draw_biowaste_with_meal(
+        self, date, X_predict, pred_waste, n_rpts, amnt_waste_per_customer
+    ):
+        fig, axes = self._template()
+        fig.suptitle(f"Forecast in date: {date}", fontweight="bold", fontsize=14)
+
+        ax = axes[0]
+        sns.barplot(X_predict, ax=ax)
+        for i, val in enumerate(X_predict.to_numpy().squeeze().astype(np.int32)):
+            ax.text(i, val + 2, val, ha="center", fontsize=11)
+        ax.set_title("Input: number of meals per type", fontweight="bold")
+
+        ax = axes[1]
+        sns.barplot(x=["Customer", "Kitchen"], y=pred_waste, ax=ax)
+        for i, val in enumerate(pred_waste):
+            ax.text(i, val + 0.2, f"{val:.2f}", ha="center", fontsize=11)
+        ax.set_title("Predicted amount of waste per type", fontweight="bold")
+
+        ax = axes[2]
+        sns.barplot(x=["Num. receipts"], y=[n_rpts], ax=ax)
+        ax.set_title("Forecasted number of receipts (POS)", fontweight="bold")
+
+        ax = axes[3]
+        sns.barplot(x=["Amount"], y=[amnt_waste_per_customer], ax=ax)
+        ax.axhline(y=40, color="r", linestyle="-.")
+        ax.set_title("Amnt. waste per customer (in gram)", fontweight="bold")
+
+        # Export image
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", bbox_inches="tight")
+
+        return buf.getvalue()
@@ -0,0 +1,79 @@
+"""Creates RestaurantRegistry class that lists the restaurants served by the app."""
+
+import json
+import os
+from pathlib import Path
+
+from loguru import logger
+
+DEFAULT_RESTAURANTS = ["Chemicum", "Physicum", "Exactum"]
+MANIFEST_NAME = "restaurants.json"
+# Comma-separated restaurants served by this process, e.g. "Chemicum,Exactum".
+# All the restaurants found are served if empty.
+SERVED_RESTAURANTS = os.getenv("SERVED_RESTAURANTS", "")
+# Models trained per restaurant, stored as `<model_name>/<restaurant>.pt`
+PER_RESTAURANT_MODELS = ("receipt", "biowaste", "occupancy", "meal")
+
+
+class RestaurantRegistry:
+    """Ordered set of restaurant names, with constant time membership test."""
+
+    def __init__(self, names: list):
+        self._names = dict.fromkeys(names)
+
+    @classmethod
+    def discover(cls, path_root: Path, served: str = SERVED_RESTAURANTS):
+        """Find the restaurants whose models are stored under `path_root`.
+
+        The restaurants are listed by the manifest `restaurants.json` (a JSON array of
+        names) if there is one. Otherwise they are the restaurants having a trained
+        model of each of PER_RESTAURANT_MODELS. DEFAULT_RESTAURANTS are used if none
+        is found.
+
+        Args:
+            path_root (Path): directory of the trained models.
+            served (str, optional): comma-separated restaurants to keep, e.g. the ones
+                of this worker. Defaults to SERVED_RESTAURANTS.
+
+        Raises:
+            ValueError: if a served restaurant is not found.
+        """
+        path_manifest = path_root / MANIFEST_NAME
+        if path_manifest.exists():
+            with open(path_manifest) as f:
+                names = json.load(f)
+        else:
+            names = sorted(
+                set.intersection(
+                    *[
+                        {path.stem for path in (path_root / model_name).glob("*.pt")}
+                        for model_name in PER_RESTAURANT_MODELS
+                    ]
+                )
+            )
+
+        if len(names) == 0:
+            logger.warning(f"No restaurant found in {path_root}, use the defaults")
+            names = DEFAULT_RESTAURANTS
+
+        served = [name.strip() for name in served.split(",") if name.strip()]
+        if len(served) > 0:
+            unknown = [name for name in served if name not in names]
+            if len(unknown) > 0:
+                raise ValueError(f"Served restaurants not found: {unknown}")
+
+            names = [name for name in names if name in served]
+
+        logger.info(f"Serve restaurants: {', '.join(names)}")
+
+        return cls(names)
+
+    def __contains__(self, name) -> bool:
+        # Names parsed from a request may be of any JSON type, lists being unhashable
+        return isinstance(name, str) and name in self._names
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
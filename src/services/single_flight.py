@@ -0,0 +1,51 @@
+"""Creates SingleFlight class that merges concurrent identical calls."""
+
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Lets concurrent calls with the same key share one computation.
+
+    The first call of a key runs the function, and the calls of the same key made
+    while it runs wait for it and get its result, or raise its exception. Nothing is
+    kept once it is done: later calls run the function again. Waiters get the same
+    object as the first caller, so the result must not be modified.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        # Calls that waited for another one instead of running the function
+        self.shared = 0
+
+    def do(self, key, func, *args, **kwargs):
+        """Return `func(*args, **kwargs)`, or the result of the call of `key` in flight.
+
+        Args:
+            key (hashable): identifier of the call, e.g. a method name and arguments.
+            func (callable): function to run if no call of `key` is in flight.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            in_flight = call is not None
+            if in_flight:
+                self.shared += 1
+            else:
+                call = self._calls[key] = Future()
+
+        if in_flight:
+            return call.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+        return result
@@ -0,0 +1,61 @@
+import itertools
+import unittest
+
+from src.benchmarks.load_test import (
+    generate_requests,
+    percentile,
+    replay_requests,
+    saturation,
+)
+
+
+def _stage(concurrency, throughput, error_rate=0.0):
+    result = {"throughput": throughput, "error_rate": error_rate}
+
+    return {"concurrency": concurrency, "total": result, "routes": {"a": result}}
+
+
+class TestLoadTest(unittest.TestCase):
+    def test_requests_are_reproducible(self):
+        mix = {"receipts": 1, "co2_from_meals": 1, "recommendation": 1}
+
+        first = list(itertools.islice(generate_requests(mix, ["Chemicum"], 1), 20))
+        second = list(itertools.islice(generate_requests(mix, ["Chemicum"], 1), 20))
+
+        self.assertEqual(first, second)
+        self.assertEqual({name for name, _ in first}, set(mix))
+
+    def test_replay_in_order(self):
+        requests = replay_requests(["GET /forecast/meal?days=5", "/metrics", ""])
+
+        self.assertEqual(
+            list(itertools.islice(requests, 3)),
+            [
+                ("/forecast/meal", "/forecast/meal?days=5"),
+                ("/metrics", "/metrics"),
+                ("/forecast/meal", "/forecast/meal?days=5"),
+            ],
+        )
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3], 95), 3)
+
+    def test_saturation_when_throughput_stops_growing(self):
+        stages = [_stage(1, 10), _stage(2, 19), _stage(4, 20), _stage(8, 20)]
+
+        self.assertEqual(saturation(stages), 2)
+        self.assertEqual(saturation(stages, "a"), 2)
+
+    def test_saturation_on_errors(self):
+        stages = [_stage(1, 10), _stage(2, 20, error_rate=0.5)]
+
+        self.assertEqual(saturation(stages), 2)
+        self.assertIsNone(saturation(stages[:1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
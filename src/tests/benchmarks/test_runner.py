@@ -0,0 +1,32 @@
+import unittest
+
+from src.benchmarks.runner import compare, measure, summarize
+
+
+class TestRunner(unittest.TestCase):
+    def test_summarize(self):
+        stats = summarize([0.4, 0.1, 0.3, 0.2])
+
+        self.assertEqual(stats["count"], 4)
+        self.assertEqual(stats["min"], 0.1)
+        self.assertAlmostEqual(stats["median"], 0.25)
+        self.assertEqual(stats["p95"], 0.4)
+        self.assertAlmostEqual(stats["mean"], 0.25)
+
+    def test_measure_reports_first_call_apart(self):
+        calls = []
+        stats = measure(lambda: calls.append(None), repeat=3)
+
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(stats["count"], 3)
+        self.assertIn("first", stats)
+
+    def test_compare_medians_of_common_cases(self):
+        baseline = {"results": {"a": {"median": 2.0}, "b": {"median": 1.0}}}
+        current = {"results": {"a": {"median": 1.0}, "c": {"median": 1.0}}}
+
+        self.assertEqual(compare(baseline, current), {"a": 0.5})
+
+
+if __name__ == "__main__":
+    unittest.main()
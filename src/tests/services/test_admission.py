@@ -0,0 +1,70 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from src.services.admission import AdmissionLimiter, Rejected
+
+
+def wait_for_waiting(limiter: AdmissionLimiter, count: int):
+    deadline = time.monotonic() + 5
+    while limiter.waiting < count and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+class TestAdmissionLimiter(unittest.TestCase):
+    def setUp(self):
+        self.limiter = AdmissionLimiter(max_concurrent=1, max_queue=1, queue_timeout=5)
+        self.release = threading.Event()
+
+    def slow(self, value):
+        self.release.wait(5)
+
+        return value
+
+    def test_free_slot_runs_right_away(self):
+        self.assertEqual(self.limiter.call(lambda x: x * 2, 21), 42)
+        self.assertEqual(self.limiter.active, 0)
+
+    def test_waiter_runs_once_slot_is_freed(self):
+        with ThreadPoolExecutor(2) as executor:
+            first = executor.submit(self.limiter.call, self.slow, 1)
+            second = executor.submit(self.limiter.call, self.slow, 2)
+            wait_for_waiting(self.limiter, 1)
+            self.release.set()
+
+            self.assertEqual([first.result(), second.result()], [1, 2])
+
+        self.assertEqual(self.limiter.rejected, {"queue_full": 0, "timeout": 0})
+
+    def test_full_queue_rejects_right_away(self):
+        with ThreadPoolExecutor(2) as executor:
+            executor.submit(self.limiter.call, self.slow, 1)
+            executor.submit(self.limiter.call, self.slow, 2)
+            wait_for_waiting(self.limiter, 1)
+
+            with self.assertRaises(Rejected) as cm:
+                self.limiter.call(self.slow, 3)
+            self.release.set()
+
+        self.assertEqual(cm.exception.reason, "queue_full")
+        self.assertEqual(self.limiter.rejected["queue_full"], 1)
+
+    def test_long_wait_rejects(self):
+        self.limiter.queue_timeout = 0.05
+
+        with ThreadPoolExecutor(1) as executor:
+            executor.submit(self.limiter.call, self.slow, 1)
+            while self.limiter.active < 1:
+                time.sleep(0.001)
+
+            with self.assertRaises(Rejected) as cm:
+                self.limiter.call(self.slow, 2)
+            self.release.set()
+
+        self.assertEqual(cm.exception.reason, "timeout")
+        self.assertEqual(self.limiter.waiting, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+
+from src.services.cache import LRUCache, TTLCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache = LRUCache(max_size=2)
+
+    def test_missing_key_returns_default(self):
+        self.assertIsNone(self.cache.get("image"))
+        self.assertEqual(self.cache.get("image", b""), b"")
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.put("a", 1)
+        self.cache.put("b", 2)
+        self.cache.get("a")
+        self.cache.put("c", 3)
+
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertIsNone(self.cache.get("b"))
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_entry_expires_after_ttl(self):
+        cache = TTLCache(max_size=2, ttl=0)
+        cache.put("dishes", 1)
+
+        self.assertIsNone(cache.get("dishes"))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+    def test_entry_is_served_before_ttl(self):
+        cache = TTLCache(max_size=2, ttl=60)
+        cache.put("dishes", 1)
+
+        self.assertEqual(cache.get("dishes"), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
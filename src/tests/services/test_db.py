@@ -0,0 +1,186 @@
+import contextlib
+import datetime
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import pandas as pd
+
+from src.services import db
+
+
+class Cursor:
+    """Cursor answering each query with the columns and rows given for it."""
+
+    def __init__(self, results: list):
+        self.results = results
+        self.executed = []
+
+    def execute(self, query, params=None, prepare=None):
+        self.executed.append((query, params, prepare))
+
+        columns, self.rows = next(result for q, result in self.results if q is query)
+        self.description = [SimpleNamespace(name=name) for name in columns]
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+
+        return rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class Connection:
+    def __init__(self, results: list):
+        self.results = results
+        self.cursors = []
+        self.pipelines = 0
+
+    def cursor(self, name=None):
+        self.cursors.append(Cursor(self.results))
+
+        return self.cursors[-1]
+
+    @contextlib.contextmanager
+    def pipeline(self):
+        self.pipelines += 1
+        yield
+
+
+class TestFetch(unittest.TestCase):
+    def setUp(self):
+        self.rows = [(i, f"Dish {i}", "vegan", "Chemicum") for i in range(5)]
+        self.conn = Connection(
+            [
+                (
+                    db.fetch_queries["dishes"],
+                    (["meal_id", "dish", "category", "restaurant"], self.rows),
+                )
+            ]
+        )
+        pool = SimpleNamespace(connection=lambda: contextlib.nullcontext(self.conn))
+
+        patcher = mock.patch.object(db, "get_pool", return_value=pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_columns_are_built_from_chunks(self):
+        with mock.patch.object(db, "FETCH_CHUNK_SIZE", 2):
+            ret = db._fetch("dishes")
+
+        self.assertEqual(
+            list(ret.columns), ["meal_id", "dish", "category", "restaurant"]
+        )
+        self.assertEqual(ret.to_records(index=False).tolist(), self.rows)
+        self.assertEqual(ret["meal_id"].dtype, "int64")
+
+    def test_chunks_are_yielded_as_dataframes(self):
+        chunks = list(db.fetch_chunks("dishes", chunksize=2))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(
+            pd.concat(chunks, ignore_index=True).to_records(index=False).tolist(),
+            self.rows,
+        )
+
+
+class TestFetchRecommendation(unittest.TestCase):
+    def setUp(self):
+        queries = db.recommendation_queries
+        self.conn = Connection(
+            [
+                (
+                    db.dishes_info_query,
+                    (
+                        ["meal_id", "dish", "category", "restaurant", "co2", "waste"],
+                        [
+                            (1, "Lohikeitto", "fish", "Chemicum", 0.9, 12.0),
+                            (2, "Falafel", "vegan", "Chemicum", 0.3, 8.5),
+                            (3, "Pasta", "vegetarian", "Chemicum", 0.5, 10.0),
+                        ],
+                    ),
+                ),
+                (
+                    queries["pieces_per_dish"],
+                    (["meal_id", "pcs_per_dish"], [(2, 80), (1, 120)]),
+                ),
+                (
+                    queries["menus_info"],
+                    (
+                        db.MENUS_INFO_COLUMNS,
+                        [(1, 2, 3, 4, 1.5, 30.0, 300, 0.01, 0.1)],
+                    ),
+                ),
+                (queries["pieces_whole"], (["pcs"], [(950,)])),
+            ]
+        )
+        pool = SimpleNamespace(connection=lambda: contextlib.nullcontext(self.conn))
+
+        patcher = mock.patch.object(db, "get_pool", return_value=pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        db.invalidate_reference_cache()
+        self.addCleanup(db.invalidate_reference_cache)
+
+    def executed(self) -> list:
+        return [e for cur in self.conn.cursors for e in cur.executed]
+
+    def test_queries_select_listed_columns(self):
+        queries = {**db.recommendation_queries, "dishes_info": db.dishes_info_query}
+        for name, query in queries.items():
+            with self.subTest(name):
+                self.assertNotIn("*", query.as_string(None))
+
+    def test_data_of_the_day_in_one_pipelined_round_trip(self):
+        db.fetch_recommendation(datetime.date(2024, 5, 9), "Chemicum")
+        self.conn.cursors, self.conn.pipelines = [], 0
+
+        db.fetch_recommendation(datetime.date(2024, 5, 9), "Chemicum")
+
+        self.assertEqual(self.conn.pipelines, 1)
+        self.assertEqual(
+            [query for query, _, _ in self.executed()],
+            list(db.recommendation_queries.values()),
+        )
+        for _, params, prepare in self.executed():
+            self.assertEqual(
+                params, {"date": datetime.date(2024, 5, 9), "restaurant": "Chemicum"}
+            )
+            self.assertTrue(prepare)
+
+    def test_joined_dishes_are_read_once(self):
+        for _ in range(3):
+            db.fetch_recommendation("2024-05-09", "Chemicum")
+
+        queries = [query for query, _, _ in self.executed()]
+        self.assertEqual(queries.count(db.dishes_info_query), 1)
+        self.assertEqual(queries.count(db.recommendation_queries["menus_info"]), 3)
+
+    def test_joined_dishes_are_read_again_once_a_table_is_invalidated(self):
+        db.fetch_recommendation("2024-05-09", "Chemicum")
+        db.invalidate_reference_cache("co2")
+        db.fetch_recommendation("2024-05-09", "Chemicum")
+
+        queries = [query for query, _, _ in self.executed()]
+        self.assertEqual(queries.count(db.dishes_info_query), 2)
+
+    def test_result_shape(self):
+        ret = db.fetch_recommendation("2024-05-09", "Chemicum")
+
+        self.assertEqual(list(ret), ["dishes_info", "menus_info", "pieces_whole"])
+        self.assertEqual(list(ret["dishes_info"].columns), db.DISHES_INFO_COLUMNS)
+        self.assertEqual(
+            ret["dishes_info"][["meal_id", "co2", "pcs_per_dish"]].values.tolist(),
+            [[1, 0.9, 120], [2, 0.3, 80]],
+        )
+        self.assertEqual(list(ret["menus_info"].columns), db.MENUS_INFO_COLUMNS)
+        self.assertEqual(ret["pieces_whole"]["pcs"].item(), 950)
+
+
+if __name__ == "__main__":
+    unittest.main()
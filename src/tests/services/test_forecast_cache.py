@@ -0,0 +1,68 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.services.model_service import ForecastCache
+
+
+class TestForecastCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.calls = []
+        self.cache = ForecastCache(max_days=10)
+
+    def predict(self, num_steps):
+        self.calls.append(num_steps)
+
+        return np.arange(num_steps)
+
+    def test_shorter_horizon_is_sliced_from_longest_forecast(self):
+        pred = self.cache.get(("receipt", "Chemicum"), 2, 9, self.predict)
+
+        self.assertEqual(self.calls, [90])
+        np.testing.assert_array_equal(pred, np.arange(18))
+
+    def test_forecast_is_computed_once_per_model(self):
+        self.cache.get(("meal", "Exactum"), 3, 1, self.predict)
+        self.cache.get(("meal", "Exactum"), 5, 1, self.predict)
+
+        self.assertEqual(self.calls, [10])
+
+    def test_longer_horizon_than_cached_predicts_directly(self):
+        pred = self.cache.get(("meal", "Exactum"), 12, 1, self.predict)
+
+        self.assertEqual(self.calls, [12])
+        self.assertEqual(len(pred), 12)
+        self.assertEqual(self.cache.bypasses, 1)
+
+    def test_get_or_compute_computes_once(self):
+        table = self.cache.get_or_compute(("receipt_per_day", None), lambda: [1, 2])
+        again = self.cache.get_or_compute(("receipt_per_day", None), lambda: [3])
+
+        self.assertIs(table, again)
+
+    def test_concurrent_misses_compute_once(self):
+        release = threading.Event()
+
+        def compute():
+            self.calls.append(None)
+            release.wait(5)
+
+            return [1, 2]
+
+        with ThreadPoolExecutor(4) as executor:
+            futures = [
+                executor.submit(self.cache.get_or_compute, ("meal", "Exactum"), compute)
+                for _ in range(4)
+            ]
+            deadline = time.monotonic() + 5
+            while self.cache.in_flight.shared < 3 and time.monotonic() < deadline:
+                time.sleep(0.001)
+            release.set()
+
+            results = [f.result() for f in futures]
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertTrue(all(result is results[0] for result in results))
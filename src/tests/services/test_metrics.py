@@ -0,0 +1,54 @@
+import unittest
+
+from src.services import metrics
+from src.services.metrics import Collected, Histogram
+
+
+class TestHistogram(unittest.TestCase):
+    def setUp(self) -> None:
+        self.histogram = Histogram("test_duration_seconds", "Test", buckets=(0.1, 1))
+
+    def test_buckets_are_cumulative(self):
+        self.histogram.observe(0.05, route="/a")
+        self.histogram.observe(0.1, route="/a")
+        self.histogram.observe(0.5, route="/a")
+        self.histogram.observe(5, route="/a")
+
+        samples = {
+            (name, labels.get("le")): value
+            for name, labels, value in self.histogram.samples()
+        }
+
+        self.assertEqual(samples[("test_duration_seconds_bucket", 0.1)], 2)
+        self.assertEqual(samples[("test_duration_seconds_bucket", 1)], 3)
+        self.assertEqual(samples[("test_duration_seconds_bucket", "+Inf")], 4)
+        self.assertEqual(samples[("test_duration_seconds_count", None)], 4)
+        self.assertAlmostEqual(samples[("test_duration_seconds_sum", None)], 5.65)
+
+    def test_series_are_kept_per_labels(self):
+        self.histogram.observe(0.05, route="/a")
+        self.histogram.observe(0.05, route="/b")
+
+        counts = [
+            labels["route"]
+            for name, labels, _ in self.histogram.samples()
+            if name.endswith("_count")
+        ]
+
+        self.assertEqual(sorted(counts), ["/a", "/b"])
+
+
+class TestExpose(unittest.TestCase):
+    def test_text_format(self):
+        Collected(
+            "test_hits_total",
+            "Test hits",
+            "counter",
+            lambda: [({"cache": 'a"b'}, 3)],
+        )
+
+        text = metrics.expose()
+
+        self.assertIn("# HELP test_hits_total Test hits\n", text)
+        self.assertIn("# TYPE test_hits_total counter\n", text)
+        self.assertIn('test_hits_total{cache="a\\"b"} 3\n', text)
@@ -0,0 +1,40 @@
+import unittest
+
+from src.services.model_registry import ModelRegistry
+
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self) -> None:
+        self.loaded = []
+        self.registry = ModelRegistry()
+        for restaurant in ["Chemicum", "Physicum"]:
+            self.registry.register(
+                ("receipt", restaurant), lambda r=restaurant: self.load(r)
+            )
+
+    def load(self, restaurant):
+        self.loaded.append(restaurant)
+
+        return f"model of {restaurant}"
+
+    def test_models_are_not_loaded_on_register(self):
+        self.assertEqual(self.loaded, [])
+        self.assertFalse(self.registry.is_loaded(("receipt", "Chemicum")))
+
+    def test_model_is_loaded_once_on_first_use(self):
+        self.registry.get(("receipt", "Chemicum"))
+        model = self.registry.get(("receipt", "Chemicum"))
+
+        self.assertEqual(model, "model of Chemicum")
+        self.assertEqual(self.loaded, ["Chemicum"])
+        self.assertIn(("receipt", "Chemicum"), self.registry.load_timings)
+
+    def test_warm_loads_every_model(self):
+        timings = self.registry.warm(max_workers=2)
+
+        self.assertEqual(sorted(self.loaded), ["Chemicum", "Physicum"])
+        self.assertEqual(len(timings), 2)
+
+    def test_unknown_model_raises_key_error(self):
+        with self.assertRaises(KeyError):
+            self.registry.get(("receipt", "Kaivopiha"))
@@ -0,0 +1,392 @@
+import gc
+import json
+import os
+import signal
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src.services import model_service
+from src.services.admission import AdmissionLimiter
+from src.services.model_service import DATE_FIRST_PREDICT, ModelService, _coalesced
+from src.services.single_flight import SingleFlight
+from src.tests.services.test_single_flight import wait_for_waiters
+from src.tests.trained_models import model_service as synthetic_model_service
+
+# Forecasts of 2 days by the synthetic models, recorded before the post-processing
+# of the forecasts was vectorized
+BASELINE_FORECASTS = Path(__file__).with_name("baseline_forecasts.json")
+
+
+class RolloutModel:
+    """Receipt-per-day model forecasting 100, 101... receipts from DATE_FIRST_PREDICT."""
+
+    def __init__(self):
+        self.horizons = []
+
+    def predict(self, n):
+        from darts import TimeSeries
+
+        self.horizons.append(n)
+        days = pd.bdate_range(DATE_FIRST_PREDICT, periods=n)
+
+        return TimeSeries.from_dataframe(
+            pd.DataFrame({"Chemicum_rcpts": 100.0 + np.arange(n)}, index=days),
+            freq="B",
+        )
+
+
+def _worker_preforked() -> bool:
+    """Run in a process of the forecast pool."""
+    return model_service._worker_service._preforked
+
+
+class Forecaster:
+    """Service whose forecasts block until released, failing if `error` is set."""
+
+    def __init__(self):
+        self.in_flight = SingleFlight()
+        self.limiter = AdmissionLimiter(8, 8, 5)
+        self.calls = []
+        self.release = threading.Event()
+        self.error = None
+
+    @_coalesced
+    def forecast(self, num_of_days: int = 5, restaurants: list = None):
+        self.calls.append((num_of_days, restaurants))
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+
+        return num_of_days, restaurants
+
+
+class TestCoalesced(unittest.TestCase):
+    def setUp(self):
+        self.service = Forecaster()
+        self.executor = ThreadPoolExecutor(4)
+        self.addCleanup(self.executor.shutdown)
+        # Unblock the forecasts even if a test fails before releasing them
+        self.addCleanup(self.service.release.set)
+
+    def submit(self, *args, **kwargs):
+        return self.executor.submit(self.service.forecast, *args, **kwargs)
+
+    def wait_for_calls(self, count: int):
+        deadline = time.monotonic() + 5
+        while len(self.service.calls) < count and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+    def test_same_arguments_share_one_call(self):
+        futures = [
+            self.submit(5),
+            self.submit(num_of_days=5),
+            self.submit(),
+            self.submit(5, None),
+        ]
+        wait_for_waiters(self.service.in_flight, 3)
+        self.service.release.set()
+
+        self.assertEqual([f.result() for f in futures], [(5, None)] * 4)
+        self.assertEqual(self.service.calls, [(5, None)])
+
+    def test_different_arguments_are_not_merged(self):
+        arguments = [
+            (2, None),
+            (3, None),
+            (2, ["Chemicum"]),
+            (2, ["Exactum"]),
+        ]
+        futures = [self.submit(*args) for args in arguments]
+        self.wait_for_calls(len(arguments))
+        self.service.release.set()
+
+        self.assertEqual([f.result() for f in futures], arguments)
+        self.assertCountEqual(self.service.calls, arguments)
+        self.assertEqual(self.service.in_flight.shared, 0)
+
+    def test_exception_is_raised_to_every_waiter(self):
+        futures = [self.submit(2, ["Chemicum"]) for _ in range(4)]
+        wait_for_waiters(self.service.in_flight, 3)
+        self.service.error = ValueError("no model")
+        self.service.release.set()
+
+        for future in futures:
+            with self.assertRaisesRegex(ValueError, "no model"):
+                future.result()
+        self.assertEqual(len(self.service.calls), 1)
+        self.assertEqual(self.service.limiter.active, 0)
+
+
+class TestReceiptRollout(unittest.TestCase):
+    def setUp(self):
+        self.service = ModelService(executor="thread")
+        self.model = RolloutModel()
+        self.service.registry.register(("receipt_per_day", None), lambda: self.model)
+
+        patcher = mock.patch.object(model_service, "RECEIPT_PER_DAY_HORIZON", 5)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.service.shutdown()
+
+    def test_business_days_skip_weekends(self):
+        days = {
+            "2024-05-09": 1,  # Thursday, DATE_FIRST_PREDICT
+            "2024-05-10": 2,
+            "2024-05-13": 3,  # Monday after the weekend
+        }
+
+        for date, n_bdays in days.items():
+            self.assertEqual(self.service.business_days_to(pd.Timestamp(date)), n_bdays)
+
+    def test_business_days_count_holidays(self):
+        # The rollout is indexed by business days, public holidays included, as the
+        # training data of the model
+        midsummer_eve = pd.Timestamp("2024-06-21")
+
+        self.assertEqual(
+            self.service.business_days_to(midsummer_eve),
+            len(pd.bdate_range(DATE_FIRST_PREDICT, midsummer_eve)),
+        )
+
+    def test_weekend_and_past_dates_are_rejected(self):
+        for date in ["2024-05-11", "2024-05-12", "2024-05-08"]:
+            with self.assertRaises(ValueError):
+                self.service.business_days_to(pd.Timestamp(date))
+
+    def test_dates_beyond_the_limit_are_rejected(self):
+        with mock.patch.object(model_service, "MAX_MEAL_FORECAST_BUSINESS_DAYS", 5):
+            self.assertEqual(
+                self.service.business_days_to(pd.Timestamp("2024-05-15")), 5
+            )
+
+            with self.assertRaises(ValueError):
+                self.service.business_days_to(pd.Timestamp("2024-05-16"))
+
+    def test_receipts_are_looked_up_in_the_rollout(self):
+        n_rpts = self.service._predict_receipts_per_day("Chemicum", [1, 5, 3])
+        again = self.service._predict_receipts_per_day("Chemicum", [2])
+
+        np.testing.assert_array_equal(n_rpts, [100, 104, 102])
+        self.assertEqual(again.tolist(), [101])
+        self.assertEqual(n_rpts.dtype, np.int32)
+        self.assertEqual(self.model.horizons, [5])
+
+    def test_days_beyond_the_rollout_are_predicted(self):
+        n_rpts = self.service._predict_receipts_per_day("Chemicum", [2, 7])
+
+        np.testing.assert_array_equal(n_rpts, [101, 106])
+        self.assertEqual(self.model.horizons, [5, 7])
+
+
+class TestForecastBaseline(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.service = synthetic_model_service(cls.addClassCleanup)
+        cls.baseline = json.loads(BASELINE_FORECASTS.read_text())
+        cls.forecasts = {
+            "receipt": cls.service.forecast_receipt,
+            "biowaste": cls.service.forecast_biowaste,
+            "occupancy": cls.service.forecast_occupancy,
+            "meal": cls.service.forecast_sold_meals,
+        }
+
+    def assertRecordsAlmostEqual(self, records, expected):
+        self.assertEqual(len(records), len(expected))
+        for record, expected_record in zip(records, expected):
+            self.assertEqual(record.keys(), expected_record.keys())
+            for key, value in expected_record.items():
+                if isinstance(value, str):
+                    self.assertEqual(record[key], value)
+                elif isinstance(value, dict):
+                    self.assertEqual(record[key].keys(), value.keys())
+                    np.testing.assert_allclose(
+                        [record[key][component] for component in value],
+                        list(value.values()),
+                        atol=0.01,
+                    )
+                else:
+                    self.assertAlmostEqual(record[key], value, delta=0.01)
+
+    def test_forecasts_match_the_baseline(self):
+        for name, forecast in self.forecasts.items():
+            with self.subTest(name):
+                self.assertRecordsAlmostEqual(forecast(2), self.baseline[name])
+
+    def test_columns_hold_the_baseline(self):
+        for name, forecast in self.forecasts.items():
+            with self.subTest(name):
+                columns = forecast(2, columnar=True)
+                index_name, index = next(iter(columns.items()))
+
+                records = []
+                for i, timestamp in enumerate(index):
+                    record = {index_name: timestamp}
+                    for restaurant, values in list(columns.items())[1:]:
+                        if isinstance(values, dict):
+                            record[restaurant] = {
+                                component: column[i]
+                                for component, column in values.items()
+                            }
+                        else:
+                            record[restaurant] = values[i]
+                    records.append(record)
+
+                self.assertRecordsAlmostEqual(records, self.baseline[name])
+
+
+class TestForecastExecutors(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.service = synthetic_model_service(cls.addClassCleanup)
+
+    def test_restaurants_are_predicted_apart(self):
+        preds = self.service._predict_restaurants("biowaste", 2)
+
+        self.assertEqual(list(preds), list(self.service.restaurants))
+        for restaurant, pred in preds.items():
+            pd.testing.assert_frame_equal(
+                pred, self.service._predict("biowaste", restaurant, 2)
+            )
+
+    def test_process_pool_forecasts_as_threads(self):
+        # The pool processes inherit the environment of a preloading gunicorn master
+        with mock.patch.dict(os.environ, {"PRELOAD_SHARED_MODELS": "true"}):
+            service = ModelService(executor="process")
+            self.addCleanup(service.shutdown)
+
+            self.assertEqual(service.forecast_all(2), self.service.forecast_all(2))
+            self.assertFalse(service._process_pool.submit(_worker_preforked).result())
+
+    def test_unknown_executor_is_rejected(self):
+        with self.assertRaises(ValueError):
+            ModelService(executor="gpu")
+
+
+class TestForecastTimeout(unittest.TestCase):
+    def setUp(self):
+        self.service = synthetic_model_service(self.addCleanup)
+
+        # Predictions of Exactum never end
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        predict = self.service._predict
+
+        def stuck_predict(model_name, restaurant, num_of_days):
+            if restaurant == "Exactum":
+                self.release.wait(10)
+            return predict(model_name, restaurant, num_of_days)
+
+        for patcher in [
+            mock.patch.object(self.service, "_predict", stuck_predict),
+            mock.patch.object(model_service, "FORECAST_TIMEOUT", 0.2),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_forecast_gives_up_on_stuck_predictions(self):
+        start = time.monotonic()
+
+        with self.assertRaises(FutureTimeoutError):
+            self.service.forecast_receipt(2)
+
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_all_forecasts_share_the_deadline(self):
+        start = time.monotonic()
+
+        with self.assertRaises(FutureTimeoutError):
+            self.service.forecast_all(2)
+
+        self.assertLess(time.monotonic() - start, 5)
+
+
+@unittest.skipUnless(hasattr(os, "fork"), "needs os.fork")
+class TestAfterFork(unittest.TestCase):
+    def setUp(self):
+        self.service = synthetic_model_service(self.addCleanup)
+
+    def run_forked(self, child) -> int:
+        """Run `child` in a forked process and return its exit code."""
+        pid = os.fork()
+        if pid == 0:
+            # A deadlocked child is killed instead of hanging the tests
+            signal.alarm(60)
+            try:
+                child()
+            except BaseException:
+                os._exit(1)
+            os._exit(0)
+
+        _, status = os.waitpid(pid, 0)
+
+        return os.waitstatus_to_exitcode(status)
+
+    def test_worker_forked_while_locks_are_held(self):
+        self.service.reload_models()
+
+        # Held by threads of the parent at the time of the fork, which do not exist in
+        # the child
+        registry, forecast_cache = self.service.registry, self.service.forecast_cache
+        locks = [
+            registry._lock,
+            registry._key_locks[("receipt_per_day", None)],
+            forecast_cache._lock,
+            forecast_cache.in_flight._lock,
+            self.service.in_flight._lock,
+        ]
+        for lock in locks:
+            lock.acquire()
+
+        def child():
+            self.service.after_fork()
+
+            self.service.registry.register(("receipt_per_day", None), lambda: None)
+            self.assertIsNone(self.service.registry.get(("receipt_per_day", None)))
+            self.assertEqual(len(self.service.forecast_receipt(2)), 18)
+            self.assertTrue(self.service.reload_models())
+
+        try:
+            exit_code = self.run_forked(child)
+        finally:
+            for lock in locks:
+                lock.release()
+
+        self.assertEqual(exit_code, 0)
+
+    def test_models_are_not_reloaded_before_the_fork(self):
+        self.addCleanup(gc.unfreeze)
+        self.service.preload_shared_models()
+        registry = self.service.registry
+
+        self.assertFalse(self.service.reload_models())
+        self.assertFalse(self.service.reload_models_in_background())
+        self.assertIs(self.service.registry, registry)
+
+        self.service.after_fork()
+
+        self.assertTrue(self.service.reload_models())
+        self.assertIsNot(self.service.registry, registry)
+
+    def test_worker_watches_the_models_loaded_before_the_fork(self):
+        model_files = self.service._model_files
+
+        with mock.patch.object(model_service, "MODEL_WATCH_INTERVAL", 60):
+            self.service.after_fork()
+
+        self.assertEqual(self.service._watcher.interval, 60)
+        # Changes made between the load and the fork are still detected
+        self.assertIs(self.service._watcher.current, model_files)
+
+
+if __name__ == "__main__":
+    unittest.main()
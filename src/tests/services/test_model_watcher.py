@@ -0,0 +1,44 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from src.services.model_watcher import ModelWatcher, snapshot_files
+
+
+class TestModelWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path_root = Path(self.tmp.name)
+        (self.path_root / "co2").mkdir()
+        (self.path_root / "co2" / "Chemicum.json").write_text("old")
+
+        self.changed = threading.Event()
+        self.watcher = ModelWatcher(self.path_root, self.changed.set, interval=0.05)
+
+    def tearDown(self):
+        self.watcher.stop()
+        self.tmp.cleanup()
+
+    def test_no_change(self):
+        self.watcher.start()
+
+        self.assertFalse(self.changed.wait(0.3))
+
+    def test_new_model(self):
+        self.watcher.start()
+        (self.path_root / "co2" / "Chemicum.json").write_text("retrained")
+
+        self.assertTrue(self.changed.wait(2))
+
+    def test_change_since_snapshot(self):
+        # e.g. models retrained after a parent process loaded them, before a fork
+        snapshot = snapshot_files(self.path_root)
+        (self.path_root / "co2" / "Chemicum.json").write_text("retrained")
+        self.watcher.start(snapshot)
+
+        self.assertTrue(self.changed.wait(2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from xgboost import XGBRegressor
+
+from src.services.model_service import ModelService
+from src.services.onnx_export import check_parity, export_co2_model
+from src.services.onnx_runtime import OnnxRegressor, create_session
+from src.tests.trained_models import path_trained_models
+
+
+class TestOnnxExport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path_root = Path(self.tmp.name)
+        (self.path_root / "co2").mkdir()
+
+        X = np.random.default_rng(0).uniform(0, 100, (200, 5)).astype(np.float32)
+        self.regressor = XGBRegressor(n_estimators=10, max_depth=3)
+        self.regressor.fit(X, X @ np.array([1.0, 2.0, 0.5, 3.0, 0.2]))
+        self.regressor.save_model(self.path_root / "co2/Aug21_XGBoost_Chemicum.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_exported_model_predicts_as_original(self):
+        path_onnx = export_co2_model(self.path_root, "Chemicum")
+
+        X = np.array([[10, 20, 30, 40, 50], [0, 0, 0, 0, 0]], dtype=np.float32)
+        onnx_regressor = OnnxRegressor(create_session(path_onnx))
+
+        np.testing.assert_allclose(
+            onnx_regressor.predict(X), self.regressor.predict(X), rtol=1e-4
+        )
+
+    def test_parity_check_fails_on_different_predictions(self):
+        with self.assertRaises(ValueError):
+            check_parity(np.array([1.0, 2.0]), np.array([1.0, 2.5]))
+
+
+class TestServedExport(unittest.TestCase):
+    def setUp(self):
+        # The models are modified, so they are copied
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path_root = Path(self.tmp.name) / "models"
+        shutil.copytree(path_trained_models(), self.path_root)
+
+        patcher = mock.patch.object(
+            ModelService, "PATH_ROOT_TRAINED_MODEL", self.path_root
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.service = ModelService(executor="thread")
+        self.addCleanup(self.service.shutdown)
+
+        self.X = np.array([[10, 20, 30, 40, 50]], dtype=np.float32)
+
+    def test_export_is_served(self):
+        export_co2_model(self.path_root, "Chemicum")
+        self.service.reload_models()
+
+        self.assertIsInstance(
+            self.service._model("co2_from_meal", "Chemicum"), OnnxRegressor
+        )
+
+    def test_retrained_model_is_served_instead_of_older_export(self):
+        export_co2_model(self.path_root, "Chemicum")
+
+        X = np.random.default_rng(1).uniform(0, 300, (200, 5)).astype(np.float32)
+        retrained = XGBRegressor(n_estimators=10, max_depth=3).fit(X, X.sum(1) * 2.0)
+        retrained.save_model(self.path_root / "co2/Aug21_XGBoost_Chemicum.json")
+        self.service.reload_models()
+
+        pred = self.service.forecast_co2_with_meal("Chemicum", *self.X[0])
+
+        self.assertAlmostEqual(
+            pred["predicted_co2"], retrained.predict(self.X).item(), places=3
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from skl2onnx import to_onnx
+from sklearn.linear_model import LinearRegression
+
+from src.services.onnx_runtime import OnnxRegressor, create_session, session_options
+
+
+class TestOnnxRegressor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path_model = Path(self.tmp.name) / "model.onnx"
+
+        X = np.arange(20, dtype=np.float32).reshape(10, 2)
+        self.y = np.stack([X.sum(axis=1), X[:, 0] - X[:, 1]], axis=1)
+        onx = to_onnx(LinearRegression().fit(X, self.y), X[:1])
+        self.path_model.write_bytes(onx.SerializeToString())
+
+        self.regressor = OnnxRegressor(create_session(self.path_model))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_input_is_converted_to_model_type(self):
+        self.assertEqual(self.regressor.input_dtype, np.float32)
+
+        pred = self.regressor.predict(np.array([[2.0, 3.0], [4.0, 5.0]]))
+
+        np.testing.assert_allclose(pred, [[5.0, -1.0], [9.0, -1.0]], atol=1e-4)
+
+    def test_single_row(self):
+        pred = self.regressor.predict([2.0, 3.0])
+
+        np.testing.assert_allclose(pred, [[5.0, -1.0]], atol=1e-4)
+
+    def test_session_options(self):
+        options = session_options(intra_op_threads=2, enable_mem_arena=False)
+        regressor = OnnxRegressor(create_session(self.path_model, options))
+
+        self.assertEqual(
+            regressor.session.get_session_options().intra_op_num_threads, 2
+        )
+        self.assertFalse(regressor.session.get_session_options().enable_cpu_mem_arena)
+
+
+if __name__ == "__main__":
+    unittest.main()
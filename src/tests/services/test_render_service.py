@@ -0,0 +1,57 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.services.render_service import ChartRenderer
+from src.tests.trained_models import model_service
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class TestChartRenderer(unittest.TestCase):
+    def setUp(self):
+        self.renderer = ChartRenderer(max_workers=1)
+        self.addCleanup(self.renderer.shutdown)
+
+        self.X_predict = pd.DataFrame(
+            [[10, 20, 30, 40, 50]],
+            columns=["fish", "chicken", "vegetarian", "meat", "vegan"],
+        )
+
+    def render(self, n_rpts=500):
+        return self.renderer.render_biowaste_with_meal(
+            "2024-05-09", self.X_predict, np.array([12.5, 7.25]), n_rpts, 39.5
+        )
+
+    def test_identical_charts_are_rendered_once(self):
+        image = self.render()
+        again = self.render()
+
+        self.assertTrue(image.startswith(PNG_SIGNATURE))
+        self.assertIs(again, image)
+        self.assertEqual((self.renderer.cache.hits, self.renderer.cache.misses), (1, 1))
+
+    def test_different_charts_are_rendered_apart(self):
+        image = self.render(n_rpts=500)
+        other = self.render(n_rpts=600)
+
+        self.assertTrue(other.startswith(PNG_SIGNATURE))
+        self.assertNotEqual(other, image)
+        self.assertEqual((self.renderer.cache.hits, self.renderer.cache.misses), (0, 2))
+
+
+class TestImageForecast(unittest.TestCase):
+    def test_biowaste_with_meal_as_image(self):
+        service = model_service(self.addCleanup)
+
+        image = service.forecast_biowaste_with_meal(
+            "Chemicum", 10, 20, 30, 40, 50, "2024-05-13", return_type="image"
+        )
+
+        self.assertTrue(image.startswith(PNG_SIGNATURE))
+        self.assertEqual(service.renderer.cache.misses, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.services.restaurant_registry import DEFAULT_RESTAURANTS, RestaurantRegistry
+
+
+class TestRestaurantRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path_root = Path(self.tmp.name)
+
+        for model_name in ["receipt", "biowaste", "occupancy", "meal"]:
+            (self.path_root / model_name).mkdir()
+            for restaurant in ["Exactum", "Chemicum"]:
+                (self.path_root / model_name / f"{restaurant}.pt").touch()
+        # Not a restaurant: missing from the other models
+        (self.path_root / "receipt" / "Jul_23_LightBGM.pt").touch()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_discover_from_trained_models(self):
+        restaurants = RestaurantRegistry.discover(self.path_root, served="")
+
+        self.assertEqual(list(restaurants), ["Chemicum", "Exactum"])
+        self.assertIn("Exactum", restaurants)
+        self.assertNotIn("Jul_23_LightBGM", restaurants)
+
+    def test_names_of_other_types_are_not_contained(self):
+        restaurants = RestaurantRegistry(["Chemicum", "Exactum"])
+
+        for name in [["Chemicum"], {"name": "Chemicum"}, None, 1]:
+            self.assertNotIn(name, restaurants)
+
+    def test_discover_from_manifest(self):
+        with open(self.path_root / "restaurants.json", "w") as f:
+            json.dump(["Physicum", "Chemicum"], f)
+
+        restaurants = RestaurantRegistry.discover(self.path_root, served="")
+
+        self.assertEqual(list(restaurants), ["Physicum", "Chemicum"])
+
+    def test_defaults_without_trained_models(self):
+        restaurants = RestaurantRegistry.discover(self.path_root / "missing", served="")
+
+        self.assertEqual(list(restaurants), DEFAULT_RESTAURANTS)
+
+    def test_served_restaurants(self):
+        restaurants = RestaurantRegistry.discover(self.path_root, served="Exactum")
+        self.assertEqual(list(restaurants), ["Exactum"])
+
+        with self.assertRaises(ValueError):
+            RestaurantRegistry.discover(self.path_root, served="Physicum")
+
+
+if __name__ == "__main__":
+    unittest.main()
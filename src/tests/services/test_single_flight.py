@@ -0,0 +1,65 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from src.services.single_flight import SingleFlight
+
+
+def wait_for_waiters(flight: SingleFlight, count: int):
+    deadline = time.monotonic() + 5
+    while flight.shared < count and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.calls = []
+        self.release = threading.Event()
+
+    def slow(self, value):
+        self.calls.append(value)
+        self.release.wait(5)
+
+        return value * 2
+
+    def test_concurrent_calls_share_one_computation(self):
+        with ThreadPoolExecutor(4) as executor:
+            futures = [
+                executor.submit(self.flight.do, "key", self.slow, 21) for _ in range(4)
+            ]
+            wait_for_waiters(self.flight, 3)
+            self.release.set()
+
+            results = [f.result() for f in futures]
+
+        self.assertEqual(results, [42] * 4)
+        self.assertEqual(self.calls, [21])
+
+    def test_exception_is_raised_to_every_caller(self):
+        def fail():
+            self.release.wait(5)
+            raise ValueError("no model")
+
+        with ThreadPoolExecutor(2) as executor:
+            futures = [executor.submit(self.flight.do, "key", fail) for _ in range(2)]
+            wait_for_waiters(self.flight, 1)
+            self.release.set()
+
+            for f in futures:
+                with self.assertRaises(ValueError):
+                    f.result()
+
+    def test_later_calls_compute_again(self):
+        self.release.set()
+
+        self.flight.do("key", self.slow, 1)
+        self.flight.do("key", self.slow, 1)
+
+        self.assertEqual(self.calls, [1, 1])
+        self.assertEqual(self.flight.shared, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
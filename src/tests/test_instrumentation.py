@@ -0,0 +1,56 @@
+import threading
+import unittest
+from unittest import mock
+
+from flask import Flask
+
+from src.app import instrumentation, routes
+from src.services import inline
+from src.tests.trained_models import model_service
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        # A new service, so the forecasts are not cached yet
+        self.model = model_service(self.addCleanup)
+
+        for patcher in [
+            mock.patch.object(routes, "model", self.model),
+            mock.patch.object(instrumentation, "PROFILING_ENABLED", True),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        app = Flask(__name__)
+        app.register_blueprint(routes.blueprint)
+        instrumentation.init_app(app)
+        self.client = app.test_client()
+
+    def test_profile_shows_the_predictions(self):
+        resp = self.client.get("/forecast/receipts?days=2", headers={"X-Profile": "1"})
+
+        self.assertEqual(resp.headers["X-Profile-Status"], "200")
+        self.assertIn("_predict_frame", resp.get_data(as_text=True))
+        self.assertFalse(inline.active())
+
+    def test_requests_not_profiled_use_the_pools(self):
+        threads = []
+        predict_frame = self.model._predict_frame
+
+        def record_thread(*args):
+            threads.append(threading.current_thread().name)
+
+            return predict_frame(*args)
+
+        with mock.patch.object(self.model, "_predict_frame", record_thread):
+            resp = self.client.get("/forecast/receipts?days=2")
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn("X-Profile-Status", resp.headers)
+        self.assertEqual(len(threads), len(self.model.restaurants))
+        for name in threads:
+            self.assertTrue(name.startswith("forecast"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import gzip
+import json
+import unittest
+
+from flask import Flask
+
+from src.app import responses
+
+
+class TestJsonResponse(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.data = [
+            {"date": f"2024-05-{i:02d}", "Chemicum": i * 1.5} for i in range(1, 31)
+        ]
+
+    def get(self, headers=None):
+        with self.app.test_request_context(headers=headers or {}):
+            return responses.json_response(self.data)
+
+    def test_body_is_json_with_etag(self):
+        resp = self.get()
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.mimetype, "application/json")
+        self.assertEqual(json.loads(resp.get_data()), self.data)
+        self.assertIsNotNone(resp.get_etag()[0])
+
+    def test_not_modified_if_etag_matches(self):
+        etag = self.get().headers["ETag"]
+
+        resp = self.get({"If-None-Match": etag})
+
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.get_data(), b"")
+
+    def test_gzip_if_accepted(self):
+        plain = self.get()
+        resp = self.get({"Accept-Encoding": "gzip"})
+
+        self.assertEqual(resp.headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(resp.get_data()), plain.get_data())
+        self.assertNotEqual(resp.headers["ETag"], plain.headers["ETag"])
+        self.assertIn("Accept-Encoding", resp.headers["Vary"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,241 @@
+import unittest
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from unittest import mock
+
+from flask import Flask
+
+from src.app import routes
+from src.services import model_service as service_module
+from src.tests.trained_models import model_service
+
+MEAL_MIX = {
+    "num_fish": 10,
+    "num_chicken": 20,
+    "num_vegetarian": 30,
+    "num_meat": 40,
+    "num_vegan": 50,
+}
+
+
+def create_client():
+    app = Flask(__name__)
+    app.register_blueprint(routes.blueprint)
+
+    return app.test_client()
+
+
+class RoutesTestCase(unittest.TestCase):
+    """Serves the routes with the synthetic models."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model = model_service(cls.addClassCleanup)
+
+        patcher = mock.patch.object(routes, "model", cls.model)
+        patcher.start()
+        cls.addClassCleanup(patcher.stop)
+
+        cls.client = create_client()
+
+
+class TestBatchRoutes(RoutesTestCase):
+    def setUp(self):
+        self.meal_mixes = [
+            {"restaurant": "Exactum", "date": "2024-05-13", **MEAL_MIX},
+            {"restaurant": "Chemicum", "date": "2024-05-09", **MEAL_MIX, "num_fish": 0},
+            {"restaurant": "Exactum", "date": "2024-06-03", **MEAL_MIX, "num_meat": 5},
+        ]
+
+    def test_biowaste_results_follow_the_meal_mixes(self):
+        resp = self.client.post(
+            "/forecast/biowaste_from_meals/batch", json=self.meal_mixes
+        )
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.get_json()), len(self.meal_mixes))
+        for meal_mix, result in zip(self.meal_mixes, resp.get_json()):
+            single = self.model.forecast_biowaste_with_meal(
+                **meal_mix, return_type="numeric"
+            )
+
+            self.assertEqual(result["restaurant"], meal_mix["restaurant"])
+            self.assertEqual(result["date"], meal_mix["date"])
+            self.assertAlmostEqual(
+                result["predicted_waste_customer"], single["predicted_waste_customer"]
+            )
+            self.assertEqual(
+                result["predicted_num_receipts"], single["predicted_num_receipts"]
+            )
+
+    def test_co2_csv_body_equals_json_body(self):
+        meal_mixes = [
+            {key: value for key, value in meal_mix.items() if key != "date"}
+            for meal_mix in self.meal_mixes
+        ]
+        rows = [",".join(meal_mixes[0])] + [
+            ",".join(str(value) for value in meal_mix.values())
+            for meal_mix in meal_mixes
+        ]
+
+        from_json = self.client.post("/forecast/co2_from_meals/batch", json=meal_mixes)
+        from_csv = self.client.post(
+            "/forecast/co2_from_meals/batch",
+            data="\n".join(rows),
+            content_type="text/csv",
+        )
+
+        self.assertEqual(from_json.status_code, 200)
+        self.assertEqual(from_csv.get_json(), from_json.get_json())
+        self.assertEqual(len(from_json.get_json()), len(meal_mixes))
+        for meal_mix, result in zip(meal_mixes, from_json.get_json()):
+            single = self.model.forecast_co2_with_meal(**meal_mix)
+
+            self.assertAlmostEqual(
+                result["predicted_co2"], single["predicted_co2"], places=4
+            )
+
+    def test_invalid_batches_are_rejected(self):
+        missing_field = dict(self.meal_mixes[0])
+        del missing_field["num_vegan"]
+        bodies = {
+            "missing field": [missing_field],
+            "unknown restaurant": [{**self.meal_mixes[0], "restaurant": "Unicafe"}],
+            "restaurant not a string": [
+                {**self.meal_mixes[0], "restaurant": ["Exactum"]}
+            ],
+            "bad type": [{**self.meal_mixes[0], "num_fish": "many"}],
+            "bad date": [{**self.meal_mixes[0], "date": "someday"}],
+            "not a number": [{**self.meal_mixes[0], "num_fish": "nan"}],
+            "infinite": [{**self.meal_mixes[0], "num_meat": "inf"}],
+            "not an object": [self.meal_mixes[0], 1],
+            "empty body": [],
+            "not an array": self.meal_mixes[0],
+        }
+
+        for name, body in bodies.items():
+            with self.subTest(name):
+                resp = self.client.post(
+                    "/forecast/biowaste_from_meals/batch", json=body
+                )
+
+                self.assertEqual(resp.status_code, 400)
+
+    def test_item_with_unforecastable_date_is_named(self):
+        dates = {
+            "weekend": "2024-05-11",
+            "before the first forecast": "2024-05-08",
+            "too far ahead": "2099-01-05",
+        }
+
+        for name, date in dates.items():
+            with self.subTest(name):
+                meal_mixes = [*self.meal_mixes, {**self.meal_mixes[0], "date": date}]
+                resp = self.client.post(
+                    "/forecast/biowaste_from_meals/batch", json=meal_mixes
+                )
+
+                self.assertEqual(resp.status_code, 400)
+                self.assertTrue(
+                    resp.get_data(as_text=True).startswith("Invalid item 3: 'date'")
+                )
+
+    def test_empty_csv_is_rejected(self):
+        resp = self.client.post(
+            "/forecast/co2_from_meals/batch", data="", content_type="text/csv"
+        )
+
+        self.assertEqual(resp.status_code, 400)
+
+
+class TestForecastDays(RoutesTestCase):
+    def test_routes_are_capped_at_the_cached_horizon(self):
+        for route, max_days in routes.MAX_FORECAST_DAYS.items():
+            with self.subTest(route):
+                self.assertLessEqual(max_days, service_module.MAX_CACHED_FORECAST_DAYS)
+
+    def test_longest_horizon_is_served_from_the_cache(self):
+        max_days = routes.MAX_FORECAST_DAYS["receipts"]
+        bypasses = self.model.forecast_cache.bypasses
+
+        resp = self.client.get(f"/forecast/receipts?days={max_days}")
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.model.forecast_cache.bypasses, bypasses)
+
+    def test_days_out_of_range_are_rejected(self):
+        max_days = routes.MAX_FORECAST_DAYS["receipts"]
+
+        for days in [0, max_days + 1]:
+            with self.subTest(days=days):
+                resp = self.client.get(f"/forecast/receipts?days={days}")
+
+                self.assertEqual(resp.status_code, 400)
+                self.assertIn(f"from 1 to {max_days}", resp.get_data(as_text=True))
+
+
+class TestForecastTimeout(RoutesTestCase):
+    def test_timed_out_forecast_is_answered_with_504(self):
+        with mock.patch.object(
+            self.model, "_predict_restaurants", side_effect=FutureTimeoutError()
+        ):
+            resp = self.client.get("/forecast/receipts?days=2")
+
+        self.assertEqual(resp.status_code, 504)
+
+
+class TestForecastAllRoute(RoutesTestCase):
+    def test_every_series_by_default(self):
+        resp = self.client.get("/forecast/all?days=2")
+
+        self.assertEqual(resp.status_code, 200)
+        data = resp.get_json()
+        self.assertEqual(data.keys(), service_module.FORECAST_SERIES.keys())
+        for name, model_name in service_module.FORECAST_SERIES.items():
+            with self.subTest(name):
+                records = self.model._forecast(model_name, 2, columnar=False)
+
+                self.assertEqual(len(data[name]), len(records))
+                for record, expected in zip(data[name], records):
+                    self.assertEqual(record.keys(), expected.keys())
+
+    def test_selected_series_as_columns(self):
+        resp = self.client.get(
+            "/forecast/all?days=2&series=meal,receipts&format=columnar"
+        )
+
+        self.assertEqual(resp.status_code, 200)
+        data = resp.get_json()
+        self.assertEqual(data.keys(), {"meal", "receipts"})
+        for name, columns in data.items():
+            forecast = service_module.FORECASTS[service_module.FORECAST_SERIES[name]]
+            index = columns.pop(forecast["index_name"])
+
+            self.assertEqual(len(index), 2 * forecast["steps_per_day"])
+            self.assertEqual(columns.keys(), set(self.model.restaurants))
+            for values in columns.values():
+                if forecast["components"] is None:
+                    self.assertEqual(len(values), len(index))
+                else:
+                    self.assertEqual(values.keys(), set(forecast["components"]))
+                    for column in values.values():
+                        self.assertEqual(len(column), len(index))
+
+    def test_invalid_query_arguments_are_rejected(self):
+        queries = {
+            "no days": "",
+            "days not a number": "days=two",
+            "days zero": "days=0",
+            "days over the limit": f"days={routes.MAX_FORECAST_DAYS['all'] + 1}",
+            "unknown series": "days=2&series=meal,sales",
+            "unknown format": "days=2&format=csv",
+        }
+
+        for name, query in queries.items():
+            with self.subTest(name):
+                resp = self.client.get(f"/forecast/all?{query}")
+
+                self.assertEqual(resp.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+"""Synthetic trained models for the tests that run the model service."""
+
+import atexit
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from src.benchmarks.fixtures import make_models
+from src.services.model_service import ModelService
+
+_path_root = None
+
+
+def path_trained_models() -> Path:
+    """Directory of small synthetic trained models, made once per test run."""
+    global _path_root
+
+    if _path_root is None:
+        _path_root = make_models(Path(tempfile.mkdtemp(prefix="fwo-models-")))
+        atexit.register(shutil.rmtree, _path_root, ignore_errors=True)
+
+    return _path_root
+
+
+def model_service(add_cleanup) -> ModelService:
+    """Create a ModelService serving the synthetic models.
+
+    Args:
+        add_cleanup (callable): `addCleanup` of a test, or `addClassCleanup` of a
+            test class, undoing the setup once done.
+    """
+    patcher = mock.patch.object(
+        ModelService, "PATH_ROOT_TRAINED_MODEL", path_trained_models()
+    )
+    patcher.start()
+    add_cleanup(patcher.stop)
+
+    service = ModelService(executor="thread")
+    add_cleanup(service.shutdown)
+
+    return service
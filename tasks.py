@@ -13,8 +13,12 @@ def start_development(ctx):
 @task
 def start_production(ctx):
     if sys.platform != "win32":
-        ctx.run("FLASK_ENV='production' python3 -m  src.app.index", pty=True)
+        ctx.run(
+            "FLASK_ENV='production' gunicorn --config gunicorn.conf.py src.app.app:app",
+            pty=True,
+        )
     else:
+        # gunicorn does not run on Windows, fall back to the development server
         ctx.run("set FLASK_ENV='production' && python -m src.app.index")
 
 
@@ -31,6 +35,32 @@ def test(ctx):
     ctx.run('pytest')
 
 
+@task
+def export_onnx(ctx, path=None):
+    ctx.run(f"python3 -m src.services.onnx_export {path or ''}")
+
+
+@task
+def benchmark(ctx, output="benchmark.json", repeat=10, models=None, seed_db=False):
+    options = f"--output {output} --repeat {repeat}"
+    if models is not None:
+        options += f" --models {models}"
+    if seed_db:
+        options += " --seed-db"
+
+    ctx.run(f"python3 -m src.benchmarks.runner {options}")
+
+
+@task
+def load_test(ctx, url=None, stages="1,2,4,8,16", duration=30, output="load_test.json"):
+    target = f"--url {url}" if url is not None else "--serve"
+
+    ctx.run(
+        f"python3 -m src.benchmarks.load_test {target} --stages {stages}"
+        f" --duration {duration} --output {output}"
+    )
+
+
 @task
 def coverage(ctx):
     if sys.platform != "win32":